@@ -1,26 +1,54 @@
 # apps/errorease/errorease/api.py
 import frappe
 import re
+import time
 import hashlib
+import contextlib
 from frappe import _
+from frappe.utils import cint, flt
+from errorease import cache, scheduler, similarity
 
 @frappe.whitelist()
-def explain_error(message, doctype=None, docname=None, route=None):
+def explain_error(message, doctype=None, docname=None, route=None, approximate=1, priority=None):
     """
     Called from the client browser via JS.
     Returns:
         {"explanation": "...", "cached": True/False}
+    Near-duplicate matches also carry "approximate": True and "similarity";
+    requests shed by the scheduler carry "shed": reason.
+    priority="prefetch" lowers a desk request below interactive clicks.
     """
-    # Log a snippet for debugging
-    frappe.log_error("ErrorEase: API Triggered", f"Message snippet: {str(message)[:200]}")
-    
+    priority = scheduler.current_priority(priority)
+    if priority == scheduler.PREFETCH:
+        # Prefetches run without a click: opt-in, and not worth an Error Log each
+        if not cint(getattr(_get_settings(), "prefetch_explanations", 0)):
+            return {"explanation": None, "cached": False, "prefetch_disabled": True}
+    else:
+        # Log a snippet for debugging
+        frappe.log_error("ErrorEase: API Triggered", f"Message snippet: {str(message)[:200]}")
+
+    return _explain(message, doctype, docname, route, approximate, priority=priority)
+
+
+def _explain(
+    message, doctype=None, docname=None, route=None, approximate=1, metrics=None, use_cache=True,
+    priority=scheduler.INTERACTIVE, schedule=True,
+):
+    """
+    Explanation pipeline behind explain_error.
+    `metrics` (optional dict) receives per-stage "timings" (ms) and payload "sizes" (bytes);
+    `use_cache=False` forces a provider call (the result is still cached);
+    `schedule=False` calls the provider without going through the scheduler.
+    """
+    stage = _StageTimer(metrics)
+
     # Prevent guest access
     if frappe.session.user == "Guest":
         return {"explanation": "❌ You must be logged in to use ErrorEase.", "cached": False}
     
-    # Load settings
+    # Load settings (cached snapshot, invalidated when the settings are saved)
     try:
-        settings = frappe.get_single("ErrorEase Settings")
+        settings = _get_settings()
     except Exception as e:
         return {"explanation": f"❌ Failed to load ErrorEase Settings: {str(e)}", "cached": False}
 
@@ -30,6 +58,7 @@ def explain_error(message, doctype=None, docname=None, route=None):
     provider = getattr(settings, "provider", None) or "Groq"
     model = getattr(settings, "model", None) or "llama-3.1-8b-instant"
     cache_seconds = int(getattr(settings, "cache_seconds", 1800) or 1800)
+    budget_mb = getattr(settings, "cache_budget_mb", None)
 
     # Decrypt API key
     try:
@@ -40,60 +69,96 @@ def explain_error(message, doctype=None, docname=None, route=None):
 
     if not api_key:
         return {"explanation": "❌ No API key found. Add an API key in ErrorEase Settings.", "cached": False}
+    stage("settings")
 
     # Sanitize the message (avoid logging secrets)
     redacted_msg = _redact_message(message or "")
+    stage("redaction", message=message, redacted=redacted_msg)
 
-    # Cache key
-    cache_key = "errorease:exp:" + hashlib.sha256(
-        (redacted_msg + str(doctype or "") + str(docname or "") + provider + model).encode()
-    ).hexdigest()
-
-    # Return cached if present
-    try:
-        cached_value = frappe.cache().get_value(cache_key)
-    except Exception:
-        cached_value = None
+    # Error fingerprint - addresses both the explanation and the overlay page
+    fingerprint, cache_key, shared_key = _cache_keys(
+        settings, message, redacted_msg, doctype, docname, provider, model
+    )
 
+    # Return cached if present; a site's own entry takes precedence over the
+    # bench-wide shared one
+    cached_value, shared = _get_cached_explanation(cache_key, shared_key) if use_cache else (None, False)
     if cached_value:
-        return {"explanation": cached_value, "cached": True}
+        stage("cache_lookup", explanation=cached_value)
+        _store_overlay_entry(
+            fingerprint, redacted_msg, shared_key if shared else cache_key, cache_seconds, budget_mb, shared
+        )
+        result = {"explanation": cached_value, "cached": True, "hash": fingerprint}
+        if shared:
+            result["shared"] = True
+        return result
+
+    # Reuse the explanation of a sufficiently close, already explained error
+    if use_cache and cint(approximate) and getattr(settings, "approximate_matches", False):
+        result = _approximate_explanation(
+            redacted_msg,
+            flt(getattr(settings, "similarity_threshold", 0)) or 0.9,
+            _similarity_scope(redacted_msg, doctype, provider, model),
+        )
+        if result:
+            stage("cache_lookup", explanation=result["explanation"])
+            if getattr(settings, "refresh_approximate", False):
+                frappe.enqueue(
+                    "errorease.api.explain_error",
+                    message=message,
+                    doctype=doctype,
+                    docname=docname,
+                    route=route,
+                    approximate=0,
+                    queue="short",
+                    job_id=f"errorease-refresh:{fingerprint}",
+                    deduplicate=True,
+                )
+            return result
+
+    stage("cache_lookup")
 
     # Build prompt for LLM
-    prompt = _build_prompt(redacted_msg, doctype, docname, route)
+    prompt = _build_prompt(redacted_msg, doctype, docname, route, shared=bool(shared_key))
+    stage("prompt_build", prompt=prompt)
 
-    # Call chosen provider
+    # Call chosen provider, behind the fair-share scheduler
+    shed = None
     try:
-        if provider.lower() == "groq":
-            raw = _call_groq(api_key, prompt, model)
-        elif provider.lower() in ["openai", "chatgpt"]:
-            raw = _call_openai(api_key, prompt, model)
-        else:
-            raw = f"❌ Unsupported provider: {provider}"
-            
+        with scheduler.slot(settings, priority) if schedule else contextlib.nullcontext():
+            stage("queue_wait")
+            if provider.lower() == "groq":
+                raw = _call_groq(api_key, prompt, model)
+            elif provider.lower() in ["openai", "chatgpt"]:
+                raw = _call_openai(api_key, prompt, model)
+            else:
+                raw = f"❌ Unsupported provider: {provider}"
+
+    except scheduler.Shed as e:
+        stage("queue_wait")
+        shed, raw = str(e), ""
     except Exception as e:
-        err = str(e)
-        # Friendly user-facing errors
-        if "authentication" in err.lower() or "api key" in err.lower() or "401" in err:
-            raw = f"❌ Invalid {provider} API key. Check ErrorEase Settings."
-        elif "quota" in err.lower() or "rate limit" in err.lower() or "429" in err:
-            raw = f"❌ {provider} API limit reached. Try again later or check your account quota."
-        elif "timeout" in err.lower():
-            raw = f"❌ {provider} service timeout. Please retry."
-        elif "model" in err.lower():
-            raw = f"❌ {provider} model '{model}' is unavailable."
-        else:
-            raw = f"❌ {provider} API error: {err[:150]}"
+        raw = _friendly_provider_error(provider, model, e)
+    stage("provider_call", response=raw)
+
+    # Shed requests get the local fallback explanation, which is never cached
+    if shed:
+        explanation = _normalize_sections("", redacted_msg, doctype)
+        stage("normalization", explanation=explanation)
+        return {"explanation": explanation, "cached": False, "shed": shed}
 
     # Normalize and ensure structured output
     explanation = _normalize_sections(raw, redacted_msg, doctype)
+    stage("normalization", explanation=explanation)
 
     # Cache successful (non-error) responses
-    if explanation and not explanation.lower().startswith("❌"):
-        try:
-            frappe.cache().set_value(cache_key, explanation, expires_in_sec=cache_seconds)
-        except Exception:
-            # don't fail on cache set errors
-            pass
+    stored = _store_explanation(
+        cache_key, shared_key, fingerprint, redacted_msg, explanation, cache_seconds,
+        provider=provider, model=model, budget_mb=budget_mb, doctype=doctype,
+    )
+    stage("cache_store")
+    if stored:
+        return {"explanation": explanation, "cached": False, "hash": fingerprint}
 
     return {"explanation": explanation, "cached": False}
 
@@ -102,19 +167,19 @@ def explain_error(message, doctype=None, docname=None, route=None):
 # Additional API Endpoints
 # ============================================================
 
+TEST_ERRORS = {
+    "validation": "ValidationError: Test validation error for ErrorEase testing",
+    "attribute": "AttributeError: 'Sales Order' object has no attribute 'test_field'",
+    "permission": "PermissionError: You don't have permission to access this document",
+    "syntax": "SyntaxError: invalid syntax in test_script.py line 10",
+    "database": "ProgrammingError: column 'test_column' does not exist",
+    "nameerror": "NameError: name 'frape' is not defined",
+}
+
 @frappe.whitelist()
 def trigger_test_error(error_type="validation"):
     """Trigger a test error for ErrorEase testing"""
-    error_types = {
-        "validation": "ValidationError: Test validation error for ErrorEase testing",
-        "attribute": "AttributeError: 'Sales Order' object has no attribute 'test_field'",
-        "permission": "PermissionError: You don't have permission to access this document",
-        "syntax": "SyntaxError: invalid syntax in test_script.py line 10",
-        "database": "ProgrammingError: column 'test_column' does not exist",
-        "nameerror": "NameError: name 'frape' is not defined",
-    }
-    
-    error_message = error_types.get(error_type, error_types["validation"])
+    error_message = TEST_ERRORS.get(error_type, TEST_ERRORS["validation"])
     
     # Get explanation
     result = explain_error(error_message, "Test DocType", "TEST-001")
@@ -126,6 +191,122 @@ def trigger_test_error(error_type="validation"):
         "cached": result.get("cached", False)
     }
 
+# Keeps one benchmark request well inside the web worker timeout
+BENCHMARK_MAX_PROVIDER_CALLS = 12
+BENCHMARK_TIME_BUDGET = 60
+
+@frappe.whitelist(methods=["POST"])
+def run_benchmark(mix=None, rounds=1, cold=1):
+    """
+    Measure the explanation pipeline against this site's real cache and provider.
+    mix: comma separated TEST_ERRORS keys (default: all); rounds: repetitions of the mix;
+    cold: 1 to start each error with a forced provider call, 0 for warm (cached) runs only.
+    Every cold run is a real, billed provider call, so cold runs are capped at
+    BENCHMARK_MAX_PROVIDER_CALLS and the whole run at BENCHMARK_TIME_BUDGET seconds.
+    """
+    frappe.only_for("System Manager")
+
+    error_types = [t.strip() for t in (mix or ",".join(TEST_ERRORS)).split(",") if t.strip() in TEST_ERRORS]
+    if not error_types:
+        frappe.throw(_("Unknown error types. Choose from: {0}").format(", ".join(TEST_ERRORS)))
+    max_rounds = max(1, BENCHMARK_MAX_PROVIDER_CALLS // len(error_types)) if cint(cold) else 20
+    rounds = max(1, min(cint(rounds), max_rounds))
+
+    runs = []
+    truncated = False
+    deadline = time.perf_counter() + BENCHMARK_TIME_BUDGET
+    for _round in range(rounds):
+        if truncated:
+            break
+        for error_type in error_types:
+            if time.perf_counter() > deadline:
+                truncated = True
+                break
+            phases = ["cold", "warm"] if cint(cold) else ["warm"]
+            for phase in phases:
+                metrics = {}
+                started = time.perf_counter()
+                # Measures the pipeline, not the System Manager's own quota
+                result = _explain(
+                    TEST_ERRORS[error_type], "Test DocType", "TEST-001",
+                    metrics=metrics, use_cache=(phase == "warm"), schedule=False,
+                )
+                metrics["sizes"]["response"] = len(frappe.as_json(result).encode())
+                runs.append({
+                    "error_type": error_type,
+                    "phase": phase,
+                    "cached": bool(result.get("cached")),
+                    "shed": result.get("shed"),
+                    "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "timings": metrics["timings"],
+                    "sizes": metrics["sizes"],
+                })
+
+    settings = _get_settings()
+    return {
+        "settings": {
+            "provider": getattr(settings, "provider", None),
+            "model": getattr(settings, "model", None),
+            "shared_cache": bool(getattr(settings, "shared_cache", False)),
+            "approximate_matches": bool(getattr(settings, "approximate_matches", False)),
+        },
+        "rounds": rounds,
+        "truncated": truncated,
+        "summary": {
+            phase: _summarize_runs([r for r in runs if r["phase"] == phase and not r["shed"]])
+            for phase in ("cold", "warm")
+        },
+        "shed_runs": sum(1 for r in runs if r["shed"]),
+        "runs": runs,
+    }
+
+def _summarize_runs(runs):
+    if not runs:
+        return {}
+
+    def stats(values):
+        values = sorted(values)
+        return {
+            "mean": round(sum(values) / len(values), 3),
+            "p50": values[len(values) // 2],
+            "max": values[-1],
+        }
+
+    stages = {}
+    for run in runs:
+        for name in run["timings"]:
+            stages.setdefault(name, []).append(run["timings"][name])
+    sizes = {}
+    for run in runs:
+        for name in run["sizes"]:
+            sizes.setdefault(name, []).append(run["sizes"][name])
+
+    return {
+        "runs": len(runs),
+        "cache_hit_ratio": round(sum(1 for r in runs if r["cached"]) / len(runs), 3),
+        "total_ms": stats([r["total_ms"] for r in runs]),
+        "stages_ms": {name: stats(values) for name, values in stages.items()},
+        "sizes_bytes": {name: stats(values) for name, values in sizes.items()},
+    }
+
+@frappe.whitelist()
+def cache_stats():
+    """Memory used and entry counts of the explanation cache"""
+    frappe.only_for("System Manager")
+
+    budget_mb = frappe.db.get_single_value("ErrorEase Settings", "cache_budget_mb")
+    return {
+        "site": cache.stats(budget_mb),
+        "shared": cache.stats(shared=True),
+    }
+
+@frappe.whitelist()
+def scheduler_stats():
+    """Queue depth, wait times and shed counts of the fair-share scheduler"""
+    frappe.only_for("System Manager")
+
+    return scheduler.stats()
+
 @frappe.whitelist()
 def check_health():
     """Check if ErrorEase is healthy and configured"""
@@ -162,23 +343,37 @@ def check_health():
 # LLM PROVIDER CALLS
 # ============================================================
 
+SYSTEM_PROMPT = (
+    "You are an ERPNext expert assistant. Produce EXACTLY two sections using these exact headings:\n\n"
+    "What Went Wrong:\n"
+    "How to Fix It:\n\n"
+    "IMPORTANT: DO NOT include any 'Prevention Tips', 'Tips', 'Best Practices', or ANY third section. "
+    "Only provide the two required sections.\n\n"
+    "Rules for 'What Went Wrong': identify the DocType and the likely failing field or attribute; explain the root cause in 1-3 short sentences.\n"
+    "Rules for 'How to Fix It': return 5-7 sequential numbered steps (1., 2., 3., ...). Steps must be actionable and ERPNext-specific (include navigation, file / script names or DocType field names if possible). Return plain text only."
+)
+
+_clients = {}
+
+
+def _get_groq_client(api_key):
+    """One client (and connection pool) per API key for the life of the worker"""
+    key = ("groq", hashlib.sha256(api_key.encode()).hexdigest())
+    client = _clients.get(key)
+    if client is None:
+        from groq import Groq
+        client = _clients[key] = Groq(api_key=api_key)
+    return client
+
+
 def _call_groq(api_key, prompt, model):
     try:
-        from groq import Groq
-        client = Groq(api_key=api_key)
+        client = _get_groq_client(api_key)
         
         res = client.chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": (
-                    "You are an ERPNext expert assistant. Produce EXACTLY two sections using these exact headings:\n\n"
-                    "What Went Wrong:\n"
-                    "How to Fix It:\n\n"
-                    "IMPORTANT: DO NOT include any 'Prevention Tips', 'Tips', 'Best Practices', or ANY third section. "
-                    "Only provide the two required sections.\n\n"
-                    "Rules for 'What Went Wrong': identify the DocType and the likely failing field or attribute; explain the root cause in 1-3 short sentences.\n"
-                    "Rules for 'How to Fix It': return 5-7 sequential numbered steps (1., 2., 3., ...). Steps must be actionable and ERPNext-specific (include navigation, file / script names or DocType field names if possible). Return plain text only."
-                )},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             max_tokens=1000,
@@ -200,15 +395,7 @@ def _call_openai(api_key, prompt, model):
         res = openai.ChatCompletion.create(
             model=model,
             messages=[
-                {"role": "system", "content": (
-                    "You are an ERPNext expert assistant. Produce EXACTLY two sections using these exact headings:\n\n"
-                    "What Went Wrong:\n"
-                    "How to Fix It:\n\n"
-                    "IMPORTANT: DO NOT include any 'Prevention Tips', 'Tips', 'Best Practices', or ANY third section. "
-                    "Only provide the two required sections.\n\n"
-                    "Rules for 'What Went Wrong': identify the DocType and the likely failing field or attribute; explain the root cause in 1-3 short sentences.\n"
-                    "Rules for 'How to Fix It': return 5-7 sequential numbered steps (1., 2., 3., ...). Steps must be actionable and ERPNext-specific (include navigation, file / script names or DocType field names if possible). Return plain text only."
-                )},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             max_tokens=1000,
@@ -226,6 +413,311 @@ def _call_openai(api_key, prompt, model):
 # HELPERS
 # ============================================================
 
+class _StageTimer:
+    """Records the time since the previous stage, and payload sizes, into `metrics`"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last = time.perf_counter()
+        if metrics is not None:
+            metrics.setdefault("timings", {})
+            metrics.setdefault("sizes", {})
+
+    def __call__(self, name, **payloads):
+        now = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics["timings"][name] = round((now - self.last) * 1000, 3)
+            for key, value in payloads.items():
+                self.metrics["sizes"][key] = len(str(value or "").encode())
+        self.last = now
+
+
+OBJECT_DOCTYPE_PATTERN = re.compile(r"'(?!NoneType')([A-Z][A-Za-z0-9 ]{1,60})' object has no attribute")
+
+
+def _get_settings():
+    return frappe.get_cached_doc("ErrorEase Settings")
+
+
+def boot_session(bootinfo):
+    """boot_session hook: client-side switches for errorease.js"""
+    try:
+        settings = _get_settings()
+    except Exception:
+        return
+    bootinfo.errorease = {
+        "prefetch": bool(getattr(settings, "enabled", False) and getattr(settings, "prefetch_explanations", False)),
+    }
+
+
+def _cache_keys(settings, message, redacted_msg, doctype, docname, provider, model):
+    """Return (fingerprint, site cache key, shared cache key or None)"""
+    fingerprint = hashlib.sha256(
+        (redacted_msg + str(doctype or "") + str(docname or "") + provider + model).encode()
+    ).hexdigest()
+
+    # Bench-wide shared pool, only for errors carrying no site-specific data
+    shared_key = None
+    if getattr(settings, "shared_cache", False) and _is_shareable(
+        message, doctype, docname, _standard_apps(settings)
+    ):
+        shared_key = "errorease:shared:exp:" + hashlib.sha256(
+            (redacted_msg + str(doctype or "") + provider + model).encode()
+        ).hexdigest()
+
+    return fingerprint, "errorease:exp:" + fingerprint, shared_key
+
+
+def _get_cached_explanation(cache_key, shared_key=None):
+    """Return (explanation or None, served from the shared pool)"""
+    entry = cache.get_value(cache_key)
+    if entry:
+        return entry.get("explanation"), False
+    if shared_key:
+        entry = cache.get_value(shared_key, shared=True)
+        if entry:
+            return entry.get("explanation"), True
+    return None, False
+
+
+def _store_explanation(
+    cache_key, shared_key, fingerprint, redacted_msg, explanation, cache_seconds,
+    provider=None, model=None, budget_mb=None, doctype=None,
+):
+    """Cache a successful explanation; error responses are never cached"""
+    if not explanation or explanation.lower().startswith("❌"):
+        return False
+
+    entry = {
+        "explanation": explanation,
+        "provider": provider,
+        "model": model,
+        "created": int(time.time()),
+    }
+    try:
+        cache.set_value(cache_key, entry, cache_seconds, budget_mb=budget_mb)
+        if shared_key:
+            cache.set_value(shared_key, entry, cache_seconds, shared=True)
+    except Exception:
+        # don't fail on cache set errors
+        pass
+    _store_overlay_entry(fingerprint, redacted_msg, cache_key, cache_seconds, budget_mb)
+
+    try:
+        similarity.add(
+            fingerprint,
+            similarity.simhash(redacted_msg),
+            cache_seconds,
+            budget_mb,
+            scope=_similarity_scope(redacted_msg, doctype, provider, model),
+        )
+    except Exception:
+        pass
+    return True
+
+
+def _approximate_explanation(redacted_msg, threshold, scope=""):
+    """Explanation of the closest indexed error in `scope`, flagged as approximate"""
+    try:
+        neighbour, score = similarity.lookup(similarity.simhash(redacted_msg), threshold, scope)
+        if not neighbour:
+            return None
+
+        entry = cache.get_value("errorease:exp:" + neighbour)
+        if not entry:
+            similarity.remove(neighbour, scope)
+            return None
+    except Exception:
+        return None
+
+    return {
+        "explanation": entry.get("explanation"),
+        "cached": True,
+        "approximate": True,
+        "similarity": score,
+        "hash": neighbour,
+    }
+
+
+def _similarity_scope(redacted_msg, doctype, provider, model):
+    """Near-duplicates are only matched within one DocType, provider and model.
+    The DocType the error itself names wins over the form it was raised on."""
+    match = OBJECT_DOCTYPE_PATTERN.search(redacted_msg or "")
+    if match:
+        doctype = match.group(1)
+    doctype = doctype or _extract_doctype_from_traceback(redacted_msg) or ""
+    return hashlib.sha256(f"{doctype}|{provider}|{model}".encode()).hexdigest()[:12]
+
+
+def _friendly_provider_error(provider, model, e):
+    """Map provider exceptions to user-facing messages"""
+    err = str(e)
+    if "authentication" in err.lower() or "api key" in err.lower() or "401" in err:
+        return f"❌ Invalid {provider} API key. Check ErrorEase Settings."
+    elif "quota" in err.lower() or "rate limit" in err.lower() or "429" in err:
+        return f"❌ {provider} API limit reached. Try again later or check your account quota."
+    elif "timeout" in err.lower():
+        return f"❌ {provider} service timeout. Please retry."
+    elif "model" in err.lower():
+        return f"❌ {provider} model '{model}' is unavailable."
+    return f"❌ {provider} API error: {err[:150]}"
+
+
+def _store_overlay_entry(fingerprint, redacted_msg, explanation_key, cache_seconds, budget_mb=None, shared=False):
+    """Back the /errorease/overlay/<hash> page; only redacted text is stored and
+    the explanation itself is referenced by its cache key, not duplicated"""
+    cache_key = f"errorease:ui:{fingerprint}"
+    try:
+        if cache.exists(cache_key):
+            return
+        cache.set_value(
+            cache_key,
+            {"error": redacted_msg, "key": explanation_key, "shared": shared},
+            cache_seconds,
+            budget_mb=budget_mb,
+        )
+    except Exception:
+        pass
+
+
+# Error lines that may be explained once for the whole bench: every variable
+# part is a schema identifier (DocType, fieldname, label, module), never a
+# document value. Anything else in the message makes it site-specific.
+# Templates flagged True name code identifiers that cannot be checked against
+# the schema; they are only shared when raised from a standard app's frame.
+_IDENT = r"[A-Za-z_][A-Za-z0-9_]*"
+_DOCTYPE = r"(?P<doctype>[A-Z][A-Za-z0-9 ]{1,60})"
+_EXC = r"(?:[\w.]+\.)?"
+SHAREABLE_TEMPLATES = [
+    (re.compile(p), needs_frame) for p, needs_frame in (
+        (rf"{_EXC}AttributeError: '{_DOCTYPE}' object has no attribute '(?P<field>{_IDENT})'", False),
+        (rf"{_EXC}AttributeError: '(?:NoneType|str|int|float|dict|list|tuple)' object has no attribute '{_IDENT}'", True),
+        (rf"{_EXC}NameError: name '{_IDENT}' is not defined", True),
+        (rf"{_EXC}KeyError: '(?P<field>{_IDENT})'", True),
+        (rf"{_EXC}(?:ModuleNotFoundError|ImportError): No module named '[\w.]+'", True),
+        (rf"(?:{_EXC}MandatoryError: |Error: )?Value missing for {_DOCTYPE}: (?P<label>[A-Za-z0-9 ]{{1,80}})", False),
+        (rf"(?:{_EXC}PermissionError: )?(?:No|Insufficient) [Pp]ermission for {_DOCTYPE}", False),
+        (rf"{_EXC}(?:OperationalError|ProgrammingError): \(1054, \"Unknown column '(?:\w+\.)?(?P<field>{_IDENT})' in '[\w ]+'\"\)", False),
+    )
+]
+TRACEBACK_LINES = re.compile(
+    r"Traceback \(most recent call last\):"
+    r"|During handling of the above exception, another exception occurred:"
+    r"|The above exception was the direct cause of the following exception:"
+)
+FRAME_LINE = re.compile(r'File "(?P<path>[^"]+)", line \d+, in [\w<>]+')
+# Appended by errorease.js to every desk request
+CLIENT_CONTEXT_LINE = re.compile(r"Context: [\w ]+ form, Before Save event, Server Script error")
+
+SCHEMA_MEMO_SECONDS = 300
+_schema_memo = {}
+
+
+def _standard_apps(settings) -> set:
+    apps = getattr(settings, "shared_cache_apps", None) or "frappe\nerpnext"
+    return {a.strip().lower() for a in re.split(r"[\s,]+", apps) if a.strip()}
+
+
+def _is_shareable(message, doctype, docname, standard_apps) -> bool:
+    """True if the error contains nothing specific to this site, so its
+    explanation can be served to every site on the bench"""
+    text = str(message or "")
+    if not text:
+        return False
+    if docname and str(docname) in text:
+        return False
+
+    matches = []
+    needs_frame = False
+    standard_frames = 0
+    expect = None
+    for line in (line.strip() for line in text.splitlines()):
+        if not line or TRACEBACK_LINES.fullmatch(line) or CLIENT_CONTEXT_LINE.fullmatch(line):
+            expect = None
+            continue
+
+        frame = FRAME_LINE.fullmatch(line)
+        if frame:
+            # Frames must come from a standard app or Python itself, never a site script
+            app = re.search(r"apps/([A-Za-z0-9_\-]+)/", frame.group("path"))
+            if app and app.group(1).lower() not in standard_apps:
+                return False
+            if not app and "/lib/python3" not in frame.group("path"):
+                return False
+            standard_frames += bool(app)
+            expect = "source"
+            continue
+
+        # Source line of the frame above, optionally followed by a caret marker
+        if expect == "source":
+            expect = "caret"
+            continue
+        if expect == "caret":
+            expect = None
+            if set(line) <= set("^~ "):
+                continue
+
+        template = next(((t, frame_only) for t, frame_only in SHAREABLE_TEMPLATES if t.fullmatch(line)), None)
+        if not template:
+            return False
+        matches.append(template[0].fullmatch(line).groupdict())
+        needs_frame = needs_frame or template[1]
+
+    if not matches or (needs_frame and not standard_frames):
+        return False
+
+    for doctype_name in {doctype, *(m.get("doctype") for m in matches)} - {None}:
+        if not _is_standard_doctype(doctype_name, standard_apps):
+            return False
+
+    for m in matches:
+        field = m.get("field") or m.get("label")
+        target = m.get("doctype") or doctype
+        if field and target and not _is_standard_field(target, field):
+            return False
+
+    return True
+
+
+def _memoized(key, compute):
+    """Per-site schema lookups for _is_shareable, so cache hits stay off the DB"""
+    key = (frappe.local.site, *key)
+    hit = _schema_memo.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+
+    try:
+        value = compute()
+    except Exception:
+        return False
+
+    if len(_schema_memo) > 4096:
+        _schema_memo.clear()
+    _schema_memo[key] = (time.monotonic() + SCHEMA_MEMO_SECONDS, value)
+    return value
+
+
+def _is_standard_doctype(doctype, standard_apps) -> bool:
+    def compute():
+        meta = frappe.db.get_value("DocType", doctype, ["custom", "module"], as_dict=True)
+        if not meta or meta.custom:
+            return False
+        app = frappe.db.get_value("Module Def", meta.module, "app_name")
+        return (app or "").lower() in standard_apps
+
+    return _memoized(("doctype", doctype, tuple(sorted(standard_apps))), compute)
+
+
+def _is_standard_field(doctype, field) -> bool:
+    """A fieldname or label that is not (or not known to be) a Custom Field"""
+    def compute():
+        return not frappe.db.exists(
+            "Custom Field", {"dt": doctype, "fieldname": field}
+        ) and not frappe.db.exists("Custom Field", {"dt": doctype, "label": field})
+
+    return _memoized(("field", doctype, field), compute)
+
+
 def _redact_message(msg: str) -> str:
     if not msg:
         return ""
@@ -237,11 +729,17 @@ def _redact_message(msg: str) -> str:
     return s
 
 
-def _build_prompt(msg, doctype, docname, route):
-    try:
-        roles = ", ".join(frappe.get_roles(frappe.session.user))
-    except Exception:
-        roles = "unknown"
+def _build_prompt(msg, doctype, docname, route, shared=False):
+    """`shared=True` leaves out the document, route and roles, so an explanation
+    served to every site on the bench cannot carry this site's data"""
+    if shared:
+        docname = route = None
+        roles = "Not specified"
+    else:
+        try:
+            roles = ", ".join(frappe.get_roles(frappe.session.user))
+        except Exception:
+            roles = "unknown"
 
     # Extract doctype from message if not provided
     if not doctype and msg:
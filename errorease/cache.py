@@ -0,0 +1,269 @@
+# apps/errorease/errorease/cache.py
+
+"""
+Size-accounted explanation cache.
+
+Entries are zlib-compressed JSON blobs stored next to frappe's own keys in
+the cache Redis. Every namespace (a site, or the bench-wide shared pool)
+keeps a small index alongside its entries:
+
+    errorease:cache:lru    sorted set   entry key -> last access time
+    errorease:cache:sizes  hash         entry key -> stored bytes
+    errorease:cache:hits   hash         entry key -> hit count
+    errorease:cache:bytes  counter      total stored bytes
+
+When a write takes the namespace over its memory budget, the least recently
+used entries are evicted first.
+
+All namespaces together are also held under one bench-wide budget
+(``errorease_bench_cache_mb`` in common_site_config.json, default 128 MB), so
+the number of sites does not multiply what ErrorEase may occupy in the cache
+Redis. Its usage is kept per expiry window, so bytes of entries that expire
+through their TTL stop counting without anyone scanning for them:
+
+    errorease:cache:bench  hash (shared)  expiry window -> stored bytes
+
+    errorease:cache:usage  zset (shared)  namespace prefix -> stored bytes
+
+A write that takes the bench over its budget trims the namespace using the
+most memory, so a busy site cannot crowd out a new or small one. Keys written
+by other modules (the similarity index) are counted through track(). Sizes
+are estimates of Redis memory, not exact figures; keep the bench budget well
+below the cache Redis' maxmemory.
+"""
+
+import json
+import time
+import zlib
+
+import frappe
+from redis import Redis
+
+LRU_KEY = "errorease:cache:lru"
+SIZES_KEY = "errorease:cache:sizes"
+HITS_KEY = "errorease:cache:hits"
+BYTES_KEY = "errorease:cache:bytes"
+BENCH_KEY = "errorease:cache:bench"
+USAGE_KEY = "errorease:cache:usage"
+
+DEFAULT_BUDGET_MB = 32
+DEFAULT_SHARED_BUDGET_MB = 64
+DEFAULT_BENCH_BUDGET_MB = 128
+BUCKET_SECONDS = 300
+# Approximate Redis per-key and index bookkeeping cost, counted with each entry
+ENTRY_OVERHEAD = 160
+
+
+def encode(value: dict) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 6)
+
+
+def decode(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def _client():
+    """Plain client on frappe's cache pool; frappe's RedisWrapper pickles and
+    re-namespaces values in some overrides, so keys are built with _key()"""
+    return Redis(connection_pool=frappe.cache().connection_pool)
+
+
+def _key(key, shared=False):
+    return frappe.cache().make_key(key, shared=shared)
+
+
+def _namespace(shared=False) -> bytes:
+    """Prefix make_key puts in front of every key of the namespace"""
+    prefix = _key("", shared)
+    return prefix if isinstance(prefix, bytes) else prefix.encode()
+
+
+def _index_key(namespace, key) -> bytes:
+    return namespace + key.encode()
+
+
+def budget_bytes(budget_mb=None, shared=False):
+    if shared:
+        budget_mb = frappe.conf.get("errorease_shared_cache_mb") or DEFAULT_SHARED_BUDGET_MB
+    return int(budget_mb or DEFAULT_BUDGET_MB) * 1024 * 1024
+
+
+def bench_budget_bytes():
+    return int(frappe.conf.get("errorease_bench_cache_mb") or DEFAULT_BENCH_BUDGET_MB) * 1024 * 1024
+
+
+def _window(expires_in_sec=0):
+    """Expiry window an entry's bytes are counted in; the current one with no argument"""
+    return int((time.time() + expires_in_sec) // BUCKET_SECONDS) + (1 if expires_in_sec else 0)
+
+
+def _parse_size(value):
+    """Sizes are stored as "bytes:window" """
+    size, _sep, window = (value.decode() if isinstance(value, bytes) else str(value or "0")).partition(":")
+    return int(size or 0), int(window) if window else None
+
+
+def bench_bytes(cache=None):
+    """Bytes of all namespaces that have not yet expired; drops past windows"""
+    cache = cache or _client()
+    bench_key = _key(BENCH_KEY, shared=True)
+    now = _window()
+    windows = {int(w): int(b) for w, b in cache.hgetall(bench_key).items()}
+
+    past = [w for w in windows if w <= now]
+    if past:
+        cache.hdel(bench_key, *past)
+    return sum(b for w, b in windows.items() if w > now)
+
+
+def get_value(key, shared=False):
+    """Return the decoded entry or None; records the hit for LRU and stats"""
+    cache = _client()
+    name = _key(key, shared)
+    try:
+        blob = cache.get(name)
+        if not blob:
+            return None
+
+        pipe = cache.pipeline(transaction=False)
+        pipe.zadd(_key(LRU_KEY, shared), {name: time.time()})
+        pipe.hincrby(_key(HITS_KEY, shared), name, 1)
+        pipe.execute()
+
+        return decode(blob)
+    except Exception:
+        return None
+
+
+def exists(key, shared=False):
+    try:
+        return bool(_client().exists(_key(key, shared)))
+    except Exception:
+        return False
+
+
+def set_value(key, value, expires_in_sec, budget_mb=None, shared=False):
+    """Store a compressed entry and evict LRU entries beyond the budgets"""
+    cache = _client()
+    name = _key(key, shared)
+    blob = encode(value)
+    cache.set(name, blob, ex=expires_in_sec)
+    _account(cache, _namespace(shared), name, len(blob), expires_in_sec, budget_bytes(budget_mb, shared))
+
+
+def track(key, nbytes, expires_in_sec, budget_mb=None):
+    """Count a site key written elsewhere against the budgets; evicting it deletes it"""
+    _account(_client(), _namespace(), _key(key), nbytes, expires_in_sec, budget_bytes(budget_mb))
+
+
+def _account(cache, namespace, name, nbytes, expires_in_sec, budget):
+    sizes_key, bench_key = _index_key(namespace, SIZES_KEY), _key(BENCH_KEY, shared=True)
+    size = nbytes + 3 * len(name) + ENTRY_OVERHEAD
+    window = _window(expires_in_sec)
+
+    previous, previous_window = _parse_size(cache.hget(sizes_key, name))
+
+    pipe = cache.pipeline(transaction=False)
+    pipe.zadd(_index_key(namespace, LRU_KEY), {name: time.time()})
+    pipe.hset(sizes_key, name, f"{size}:{window}")
+    pipe.incrby(_index_key(namespace, BYTES_KEY), size - previous)
+    pipe.zincrby(_key(USAGE_KEY, shared=True), size - previous, namespace)
+    pipe.hincrby(bench_key, window, size)
+    if previous_window and previous_window > _window():
+        pipe.hincrby(bench_key, previous_window, -previous)
+    pipe.execute()
+
+    _evict(cache, namespace, budget)
+
+
+def _release(cache, namespace, members, sizes):
+    """Drop members from the index and all byte counts; returns bench bytes released"""
+    parsed = [_parse_size(s) for s in sizes]
+    total = sum(size for size, _w in parsed)
+    now = _window()
+
+    pipe = cache.pipeline(transaction=False)
+    pipe.zrem(_index_key(namespace, LRU_KEY), *members)
+    pipe.hdel(_index_key(namespace, SIZES_KEY), *members)
+    pipe.hdel(_index_key(namespace, HITS_KEY), *members)
+    pipe.decrby(_index_key(namespace, BYTES_KEY), total)
+    pipe.zincrby(_key(USAGE_KEY, shared=True), -total, namespace)
+    for size, window in parsed:
+        if window and window > now:
+            pipe.hincrby(_key(BENCH_KEY, shared=True), window, -size)
+    pipe.execute()
+    return sum(size for size, window in parsed if window and window > now)
+
+
+def _evict_oldest(cache, namespace):
+    """Evict the namespace's least recently used entry; None if it has none.
+    One at a time, so an eviction never takes more than the budget needs"""
+    oldest = [member for member, _score in cache.zpopmin(_index_key(namespace, LRU_KEY), 1)]
+    if not oldest:
+        # Index is empty but the counters may not be; they have drifted, reset them
+        cache.set(_index_key(namespace, BYTES_KEY), 0)
+        cache.zrem(_key(USAGE_KEY, shared=True), namespace)
+        return None
+
+    sizes = cache.hmget(_index_key(namespace, SIZES_KEY), oldest)
+    cache.delete(*oldest)
+    return _release(cache, namespace, oldest, sizes)
+
+
+def _evict(cache, namespace, budget):
+    """Hold the writing namespace to its own budget, then the bench to the
+    bench-wide one by trimming whichever namespace uses the most"""
+    bench_used = bench_bytes(cache)
+
+    while int(cache.get(_index_key(namespace, BYTES_KEY)) or 0) > budget:
+        released = _evict_oldest(cache, namespace)
+        if released is None:
+            break
+        bench_used -= released
+
+    bench_budget = bench_budget_bytes()
+    usage_key = _key(USAGE_KEY, shared=True)
+    while bench_used > bench_budget:
+        largest = cache.zrevrange(usage_key, 0, 0)
+        if not largest:
+            return
+        released = _evict_oldest(cache, largest[0])
+        if released is not None:
+            bench_used -= released
+
+
+def prune(shared=False):
+    """Drop index entries whose keys have already expired through their TTL"""
+    cache = _client()
+    namespace = _namespace(shared)
+    members = cache.zrange(_index_key(namespace, LRU_KEY), 0, -1)
+    if not members:
+        return 0
+
+    pipe = cache.pipeline(transaction=False)
+    for member in members:
+        pipe.exists(member)
+    expired = [m for m, alive in zip(members, pipe.execute(), strict=True) if not alive]
+    if not expired:
+        return 0
+
+    _release(cache, namespace, expired, cache.hmget(_index_key(namespace, SIZES_KEY), expired))
+    return len(expired)
+
+
+def stats(budget_mb=None, shared=False):
+    cache = _client()
+    pruned = prune(shared)
+    used = int(cache.get(_key(BYTES_KEY, shared)) or 0)
+    budget = budget_bytes(budget_mb, shared)
+    return {
+        "entries": cache.zcard(_key(LRU_KEY, shared)),
+        "bytes": used,
+        "budget_bytes": budget,
+        "used_percent": round(100.0 * used / budget, 2) if budget else 0,
+        "hits": sum(int(h) for h in cache.hvals(_key(HITS_KEY, shared))),
+        "pruned_expired": pruned,
+        "bench_bytes": bench_bytes(cache),
+        "bench_budget_bytes": bench_budget_bytes(),
+        "bench_namespaces": cache.zcard(_key(USAGE_KEY, shared=True)),
+    }
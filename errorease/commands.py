@@ -0,0 +1,50 @@
+# apps/errorease/errorease/commands.py
+
+import gzip
+import os
+
+import click
+
+PUBLIC_PATH = os.path.join(os.path.dirname(__file__), "public")
+
+# (asset, when it is loaded)
+ASSETS = [
+    ("js/errorease_boot.js", "every desk page"),
+    ("js/errorease.js", "on first error dialog"),
+    ("css/errorease.css", "on first error dialog"),
+]
+
+
+@click.command("errorease-asset-sizes")
+def asset_sizes():
+    """Report raw and gzipped sizes of the ErrorEase desk assets"""
+    startup = 0
+    click.echo(f"{'asset':<26}{'raw':>10}{'gzip':>10}  loaded")
+    for asset, loaded in ASSETS:
+        path = os.path.join(PUBLIC_PATH, asset)
+        if not os.path.exists(path):
+            click.echo(f"{asset:<26}{'missing':>10}")
+            continue
+
+        with open(path, "rb") as f:
+            data = f.read()
+        compressed = len(gzip.compress(data, compresslevel=9))
+        if loaded == "every desk page":
+            startup += compressed
+
+        click.echo(f"{asset:<26}{len(data):>10}{compressed:>10}  {loaded}")
+
+    click.echo(f"Start-up cost per desk page load: {startup} bytes gzipped")
+
+
+@click.command("errorease-dispatcher")
+@click.option("--max-in-flight", default=200, help="Provider calls kept in flight at once")
+@click.option("--grace", default=30, help="Seconds to let in-flight calls finish on shutdown")
+def dispatcher(max_in_flight, grace):
+    """Run the asyncio explanation dispatcher (bench-wide worker)"""
+    from errorease.dispatcher import run
+
+    run(max_in_flight=max_in_flight, grace_seconds=grace)
+
+
+commands = [asset_sizes, dispatcher]
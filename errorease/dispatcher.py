@@ -0,0 +1,308 @@
+# apps/errorease/errorease/dispatcher.py
+
+"""
+Asyncio explanation dispatcher.
+
+Background explanation requests (see error_interceptor.py) are pushed onto a
+bench-level Redis list instead of occupying an RQ worker for the length of a
+blocking HTTPS call. A single long-running process started with
+
+    bench errorease-dispatcher
+
+keeps many provider calls in flight over one pooled async HTTP client and
+writes results back to each site's explanation cache.
+
+Enable it with ``"errorease_dispatcher": 1`` in common_site_config.json
+(bench-wide) or in a site's site_config.json.
+
+The dispatcher and the fair-share scheduler (scheduler.py) are exclusive per
+site: the dispatcher's calls would not count against the scheduler's
+concurrency cap, so a site with the scheduler enabled runs its background
+analyses as RQ jobs, which take scheduler slots.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+
+import frappe
+
+QUEUE_KEY = "errorease:dispatch:queue"
+PENDING_KEY = "errorease:dispatch:pending:{site}:{fingerprint}"
+
+DEFAULT_MAX_QUEUE = 10000
+SITE_CONFIG_TTL = 300
+
+PROVIDER_URLS = {
+    "groq": "https://api.groq.com/openai/v1/chat/completions",
+    "openai": "https://api.openai.com/v1/chat/completions",
+    "chatgpt": "https://api.openai.com/v1/chat/completions",
+}
+
+_redis = None
+
+
+def _get_redis():
+    """Plain client on the bench cache instance; keys here are not site-namespaced"""
+    global _redis
+    if _redis is None:
+        from redis import Redis
+        _redis = Redis.from_url(frappe.conf.redis_cache)
+    return _redis
+
+
+def _logger():
+    """Bench-level log (logs/errorease.log); the dispatcher serves every site"""
+    return frappe.logger("errorease", allow_site=False)
+
+
+def is_enabled():
+    return bool(frappe.conf.get("errorease_dispatcher"))
+
+
+# ============================================================
+# PRODUCER (runs inside a site request/job)
+# ============================================================
+
+def submit(message, doctype=None, docname=None, route=None):
+    """
+    Queue an explanation for the dispatcher.
+    Returns False when the dispatcher is disabled, the site's scheduler is
+    enabled or the queue is full, so the caller can fall back to RQ.
+    """
+    if not is_enabled():
+        return False
+
+    from errorease import api
+
+    try:
+        settings = api._get_settings()
+        if not getattr(settings, "enabled", False):
+            return True
+        if getattr(settings, "scheduler_enabled", False):
+            return False
+
+        provider = getattr(settings, "provider", None) or "Groq"
+        model = getattr(settings, "model", None) or "llama-3.1-8b-instant"
+        cache_seconds = int(getattr(settings, "cache_seconds", 1800) or 1800)
+        budget_mb = getattr(settings, "cache_budget_mb", None)
+
+        redacted_msg = api._redact_message(message or "")
+        fingerprint, cache_key, shared_key = api._cache_keys(
+            settings, message, redacted_msg, doctype, docname, provider, model
+        )
+
+        cached_value, _shared = api._get_cached_explanation(cache_key, shared_key)
+        if cached_value:
+            return True
+
+        r = _get_redis()
+        max_queue = int(frappe.conf.get("errorease_dispatcher_max_queue") or DEFAULT_MAX_QUEUE)
+        if r.llen(QUEUE_KEY) >= max_queue:
+            return False
+
+        # Skip duplicates of a request that is already queued or in flight
+        site = frappe.local.site
+        if not r.set(PENDING_KEY.format(site=site, fingerprint=fingerprint), 1, nx=True, ex=cache_seconds):
+            return True
+
+        payload = {
+            "site": site,
+            "provider": provider,
+            "model": model,
+            "prompt": api._build_prompt(redacted_msg, doctype, docname, route, shared=bool(shared_key)),
+            "redacted_msg": redacted_msg,
+            "doctype": doctype,
+            "fingerprint": fingerprint,
+            "cache_key": cache_key,
+            "shared_key": shared_key,
+            "cache_seconds": cache_seconds,
+            "budget_mb": budget_mb,
+            "enqueued": time.time(),
+        }
+        r.rpush(QUEUE_KEY, json.dumps(payload))
+        return True
+
+    except Exception as e:
+        frappe.log_error("ErrorEase dispatcher submit failed", str(e))
+        return False
+
+
+# ============================================================
+# CONSUMER (bench errorease-dispatcher)
+# ============================================================
+
+def run(max_in_flight=200, grace_seconds=30):
+    """Entry point for the bench command"""
+    sites_path = os.getcwd()
+    conf = frappe.get_site_config(sites_path=sites_path)
+    redis_url = conf.get("redis_cache")
+    if not redis_url:
+        raise SystemExit("ErrorEase: redis_cache is not configured in common_site_config.json")
+
+    dispatcher = Dispatcher(sites_path, redis_url, max_in_flight, grace_seconds)
+    asyncio.run(dispatcher.serve())
+
+
+class Dispatcher:
+    def __init__(self, sites_path, redis_url, max_in_flight, grace_seconds):
+        self.sites_path = sites_path
+        self.redis_url = redis_url
+        self.max_in_flight = max_in_flight
+        self.grace_seconds = grace_seconds
+        self.site_configs = {}
+        self.in_flight = {}
+        self.processed = 0
+
+    async def serve(self):
+        try:
+            import httpx
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise SystemExit("ErrorEase: httpx is required for the dispatcher. Run: pip install httpx")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        self.redis = aioredis.from_url(self.redis_url)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        limits = httpx.Limits(
+            max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight
+        )
+
+        _logger().info(f"ErrorEase dispatcher: started, up to {self.max_in_flight} calls in flight")
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            while not stop.is_set():
+                # Backpressure: only pull work when a slot is free
+                try:
+                    await asyncio.wait_for(slots.acquire(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+
+                item = await self.redis.blpop(QUEUE_KEY, timeout=1)
+                if not item:
+                    slots.release()
+                    continue
+
+                task = asyncio.create_task(self.process(client, item[1]))
+                self.in_flight[task] = item[1]
+                task.add_done_callback(self.in_flight.pop)
+                task.add_done_callback(lambda _task: slots.release())
+
+            await self.shutdown()
+
+        await self.redis.close()
+        _logger().info(f"ErrorEase dispatcher: stopped after {self.processed} explanations")
+
+    async def shutdown(self):
+        """Let in-flight calls finish, then requeue whatever is left"""
+        if not self.in_flight:
+            return
+
+        _logger().info(f"ErrorEase dispatcher: draining {len(self.in_flight)} in-flight calls")
+        _done, pending = await asyncio.wait(list(self.in_flight), timeout=self.grace_seconds)
+        for task in pending:
+            raw = self.in_flight.get(task)
+            task.cancel()
+            if raw:
+                await self.redis.lpush(QUEUE_KEY, raw)
+
+    async def process(self, client, raw):
+        payload = json.loads(raw)
+        pending_key = PENDING_KEY.format(site=payload["site"], fingerprint=payload["fingerprint"])
+        try:
+            config = await self.site_config(payload["site"])
+            if not config.get("api_key"):
+                # Let a later submission through once a key has been configured
+                await self.redis.delete(pending_key)
+                return
+
+            content = await self.call_provider(client, config["api_key"], payload)
+            await asyncio.to_thread(self.write_back, payload, content)
+            self.processed += 1
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _logger().warning(f"ErrorEase dispatcher: {payload.get('site')}: {str(e)[:200]}")
+            await self.redis.delete(pending_key)
+
+    async def call_provider(self, client, api_key, payload):
+        from errorease.api import SYSTEM_PROMPT
+
+        url = PROVIDER_URLS.get(payload["provider"].lower())
+        if not url:
+            raise ValueError(f"Unsupported provider: {payload['provider']}")
+
+        body = {
+            "model": payload["model"],
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": payload["prompt"]},
+            ],
+            "max_tokens": 1000,
+            "temperature": 0.12,
+        }
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        # Retry rate limits and transient provider errors with backoff
+        for attempt in range(3):
+            res = await client.post(url, json=body, headers=headers)
+            if res.status_code == 429 or res.status_code >= 500:
+                retry_after = res.headers.get("retry-after")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                await asyncio.sleep(min(delay, 30))
+                continue
+            res.raise_for_status()
+            return res.json()["choices"][0]["message"]["content"].strip()
+
+        res.raise_for_status()
+
+    async def site_config(self, site):
+        cached = self.site_configs.get(site)
+        if cached and cached["loaded"] > time.monotonic() - SITE_CONFIG_TTL:
+            return cached
+
+        config = await asyncio.to_thread(self.load_site_config, site)
+        config["loaded"] = time.monotonic()
+        self.site_configs[site] = config
+        return config
+
+    def load_site_config(self, site):
+        """Runs in a worker thread; frappe.local is context-local, so it is isolated"""
+        frappe.init(site=site, sites_path=self.sites_path)
+        try:
+            frappe.connect()
+            from frappe.utils.password import get_decrypted_password
+            return {
+                "api_key": get_decrypted_password(
+                    "ErrorEase Settings", "ErrorEase Settings", "api_key", raise_exception=False
+                )
+            }
+        finally:
+            frappe.destroy()
+
+    def write_back(self, payload, content):
+        from errorease import api
+
+        frappe.init(site=payload["site"], sites_path=self.sites_path)
+        try:
+            explanation = api._normalize_sections(content, payload["redacted_msg"], payload["doctype"])
+            api._store_explanation(
+                payload["cache_key"],
+                payload["shared_key"],
+                payload["fingerprint"],
+                payload["redacted_msg"],
+                explanation,
+                payload["cache_seconds"],
+                provider=payload["provider"],
+                model=payload["model"],
+                budget_mb=payload.get("budget_mb"),
+                doctype=payload["doctype"],
+            )
+        finally:
+            frappe.destroy()
@@ -54,10 +54,17 @@ def process_error_for_errorease(exc_type, exc_value, exc_traceback):
     # Extract context
     doctype, docname = extract_context_from_traceback(traceback_text)
     
+    message = error_message + "\n\n" + traceback_text[:2000]
+
+    # Prefer the asyncio dispatcher; fall back to RQ when it is off or saturated
+    from errorease.dispatcher import submit
+    if submit(message, doctype=doctype, docname=docname):
+        return
+
     # Queue for async processing to avoid blocking
     frappe.enqueue(
         "errorease.api.explain_error",
-        message=error_message + "\n\n" + traceback_text[:2000],
+        message=message,
         doctype=doctype,
         docname=docname,
         route=None,
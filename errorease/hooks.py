@@ -7,16 +7,29 @@ app_description = "AI-powered error explanation module"
 app_email = "memoonaiqbal3710@gmail.com"
 app_license = "mit"
 
-# Include JS and CSS files
+# Only the bootstrap is included on every desk page; it loads
+# js/errorease.js and css/errorease.css the first time an error dialog appears
 app_include_js = [
-    "/assets/errorease/js/errorease.js"
-]
-
-app_include_css = [
-    "/assets/errorease/css/errorease.css"
+    "/assets/errorease/js/errorease_boot.js"
 ]
 
 # Website route
 website_route_rules = [
-    {"from_route": "/errorease/overlay", "to_route": "errorease/www/error_overlay"}
+    {"from_route": "/errorease/overlay/<error_hash>", "to_route": "error_overlay"}
 ]
+
+# HTTP caching for the overlay page
+after_request = [
+    "errorease.www.error_overlay.set_cache_headers"
+]
+
+# Optional per-worker warm-up ("errorease_warmup": 1 in common_site_config.json)
+before_request = [
+    "errorease.warmup.warm_up"
+]
+
+before_job = [
+    "errorease.warmup.warm_up"
+]
+
+boot_session = "errorease.api.boot_session"
@@ -1,279 +1,114 @@
 // apps/erpoease/errorease/public/js/errorease.js
 
+// Loaded on demand by errorease_boot.js the first time an error dialog
+// appears; the bootstrap owns the msgprint/throw patches and hands dialogs
+// over through ErrorEase.detect().
+
 // ============================================================
-// ULTIMATE FIX: Intercept ALL Frappe error displays
+// Error dialog detection
 // ============================================================
-(function () {
-    if (!window.frappe) {
-        console.warn("ErrorEase: Frappe not available");
-        return;
-    }
-    console.log("ErrorEase: Starting ULTIMATE initialization...");
-    
-    // Store originals
-    window._originalMsgprint = frappe.msgprint;
-    window._originalThrow = frappe.throw;
-    window._lastErrorEaseError = null;
-    window._errorDialogShown = false;
-    
-    // ========== CRITICAL: Patch frappe.throw FIRST ==========
-    if (frappe.throw && typeof frappe.throw === 'function') {
-        frappe.throw = function (message, title = "Error", indicator = "red") {
-            console.log("✓ ErrorEase: frappe.throw INTERCEPTED:", message.substring(0, 200));
-
-            // Store error IMMEDIATELY
-            window._lastErrorEaseError = {
-                message: message,
-                title: title,
-                timestamp: Date.now(),
-                source: 'throw'
-            };
-
-            // Mark that error is happening
-            window._errorDialogShown = true;
-
-            // Call original
-            const result = window._originalThrow.call(this, message, title, indicator);
-
-            // ULTIMATE FIX: Direct injection after ANY dialog appears
-            setTimeout(() => {
-                ultimateErrorButtonInjection(message, title);
-            }, 100);
-
-            return result;
-        };
-        console.log("✓ ErrorEase: frappe.throw ULTRA-PATCHED");
-    }
-    
-    // ========== ALSO patch msgprint ==========
-    if (frappe.msgprint && typeof frappe.msgprint === 'function') {
-        frappe.msgprint = function (opts, ...args) {
-            const result = window._originalMsgprint.call(this, opts, ...args);
-
-            let isError = false;
-            let errorMessage = '';
-            let errorTitle = '';
-
-            // ULTIMATE detection: ANYTHING that looks like error
-            if (typeof opts === 'object') {
-                errorMessage = opts.message || opts.title || '';
-                errorTitle = opts.title || '';
-
-                // Check EVERY possible error indicator
-                isError =
-                    opts.indicator === 'red' ||
-                    opts.indicator === 'orange' ||
-                    (errorTitle && errorTitle.toLowerCase().includes('error')) ||
-                    (errorMessage && errorMessage.toLowerCase().includes('error')) ||
-                    (errorTitle && errorTitle.toLowerCase().includes('server')) ||
-                    (errorMessage && errorMessage.toLowerCase().includes('exception')) ||
-                    (errorMessage && errorMessage.toLowerCase().includes('traceback')) ||
-                    (errorMessage && errorMessage.toLowerCase().includes('nameerror')) ||
-                    (errorMessage && errorMessage.toLowerCase().includes('typeerror'));
-
-            } else if (typeof opts === 'string') {
-                const lowerOpts = opts.toLowerCase();
-                isError =
-                    lowerOpts.includes('error') ||
-                    lowerOpts.includes('exception') ||
-                    lowerOpts.includes('traceback');
-                errorMessage = opts;
-            }
-
-            // Also check args
-            if (args[0] && typeof args[0] === 'object') {
-                const arg = args[0];
-                if (arg.indicator === 'red' || arg.indicator === 'orange') {
-                    isError = true;
-                }
-                if (arg.title && arg.title.toLowerCase().includes('error')) {
-                    isError = true;
-                    errorTitle = arg.title;
-                }
-            }
-
-            if (isError && errorMessage) {
-                console.log("✓ ErrorEase: msgprint error detected:", errorTitle || errorMessage.substring(0, 100));
-
-                window._lastErrorEaseError = {
-                    message: errorMessage,
-                    title: errorTitle,
-                    timestamp: Date.now(),
-                    source: 'msgprint'
-                };
-                window._errorDialogShown = true;
-
-                setTimeout(() => {
-                    ultimateErrorButtonInjection(errorMessage, errorTitle);
-                }, 100);
-            }
-
-            return result;
-        };
-        console.log("✓ ErrorEase: msgprint ULTRA-PATCHED");
-    }
-    
-    // ========== NUCLEAR OPTION: Direct DOM Observer ==========
-    const observer = new MutationObserver((mutations) => {
-        if (window._errorDialogShown) return;
-
-        for (const mutation of mutations) {
-            if (mutation.type === 'childList') {
-                mutation.addedNodes.forEach((node) => {
-                    if (node.nodeType === 1) {
-                        checkAndInject(node);
-                    }
-                });
-            }
-            else if (mutation.type === 'attributes') {
-                checkAndInject(mutation.target);
-            }
-        }
-    });
-
-    function checkAndInject(node) {
-        const dialog = node.classList?.contains('modal-dialog') ? node :
-            node.querySelector?.('.modal-dialog, .frappe-dialog, .msgprint-dialog');
-
-        if (dialog) {
-            const style = window.getComputedStyle(dialog.closest('.modal') || dialog);
-            if (style.display === 'none' || style.visibility === 'hidden') return;
-
-            console.log("ErrorEase Observer: Dialog detected (" + (dialog.className || 'unknown') + ")");
-
-            setTimeout(() => {
-                const dialogText = dialog.querySelector('.modal-body')?.textContent.trim() || dialog.textContent.trim();
-                const titleEl = dialog.querySelector('.modal-title');
-                const titleText = titleEl ? titleEl.textContent : '';
-
-                if (dialogText.toLowerCase().includes('error') ||
-                    dialogText.toLowerCase().includes('exception') ||
-                    dialogText.toLowerCase().includes('traceback') ||
-                    dialogText.toLowerCase().includes('nameerror') ||
-                    (titleText && titleText.toLowerCase().includes('error'))) {
-
-                    console.log("ErrorEase Observer: ERROR dialog found!");
-                    ultimateErrorButtonInjection(dialogText, titleText || 'Client Error');
-                }
-            }, 200);
+// Driven by frappe's dialog lifecycle only: the patched msgprint/throw and
+// bootstrap's delegated `shown.bs.modal` event. Nothing observes the DOM or
+// polls, so no work runs while no dialog is open.
+const ErrorEaseDetector = {
+    stats: { checks: 0, injections: 0, ms: 0 },
+    _queue: new Map(),
+    _scheduled: false,
+
+    // Debounce: coalesce all requests within a frame into one pass
+    schedule: function (dialog, errorMessage = '', errorTitle = '') {
+        if (!dialog) return;
+
+        // frappe reuses msg_dialog: a later error lands next to our old button
+        const existing = dialog.querySelector('.errorease-btn');
+        if (existing) {
+            refreshExplainArgs(existing, dialog, errorMessage);
+            return;
         }
-    }
-
-    observer.observe(document.body, { childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style'] });
-    console.log("✓ ErrorEase: DOM Observer started");
 
-    // ========== FALLBACK: Persistent Poller ==========
-    setInterval(() => {
-        const visibleDialogs = Array.from(document.querySelectorAll('.modal-dialog, .msgprint-dialog, .frappe-dialog')).filter(d => {
-            const style = window.getComputedStyle(d.closest('.modal') || d);
-            return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0';
+        const previous = this._queue.get(dialog);
+        this._queue.set(dialog, {
+            message: errorMessage || (previous && previous.message) || '',
+            title: errorTitle || (previous && previous.title) || ''
         });
 
-        visibleDialogs.forEach(dialog => {
-            if (dialog.querySelector('.errorease-btn')) return;
+        if (this._scheduled) return;
+        this._scheduled = true;
+        const flush = () => this.flush();
+        (window.requestAnimationFrame || setTimeout)(flush);
+    },
 
-            const dialogText = dialog.querySelector('.modal-body')?.textContent.trim() || dialog.textContent.trim();
-            const title = dialog.querySelector('.modal-title')?.textContent || '';
+    flush: function () {
+        const started = performance.now();
+        this._scheduled = false;
 
-            const isClientScript = dialogText.includes('Error in Client Script') || title.includes('Client Script');
-            const isGenericError = dialogText.toLowerCase().includes('error') || title.toLowerCase().includes('error');
+        const queued = Array.from(this._queue.entries());
+        this._queue.clear();
 
-            if (isClientScript || isGenericError) {
-                ultimateErrorButtonInjection(dialogText, title || 'Polled Error');
+        queued.forEach(([dialog, info]) => {
+            this.stats.checks++;
+            if (ultimateErrorButtonInjection(info.message, info.title, dialog)) {
+                this.stats.injections++;
             }
         });
-    }, 1000);
 
-    console.log("✓ ErrorEase: ULTIMATE initialization complete");
-})();
+        this.stats.ms += performance.now() - started;
+    }
+};
 
 // ============================================================
-// ULTIMATE Button Injection - WORKS FOR ALL DIALOGS
+// Button Injection - single pass over one dialog
 // ============================================================
 function ultimateErrorButtonInjection(errorMessage, errorTitle = '', targetDialog = null) {
-    console.log("ULTIMATE: Attempting button injection...");
+    try {
+        let dialog = targetDialog;
 
-    let attempts = 0;
-    const maxAttempts = 15;
-    const interval = 200;
+        if (!dialog) {
+            const dialogs = document.querySelectorAll('.modal.show .modal-dialog');
+            if (dialogs.length === 0) return false;
+            dialog = dialogs[dialogs.length - 1];
+        }
 
-    function attempt() {
-        attempts++;
+        if (dialog.querySelector('.errorease-btn')) return true;
 
-        try {
-            let dialog = targetDialog;
-
-            if (!dialog) {
-                const dialogs = document.querySelectorAll('.modal-dialog, .msgprint-dialog, .frappe-dialog');
-
-                if (dialogs.length === 0) {
-                    if (attempts < maxAttempts) {
-                        setTimeout(attempt, interval);
-                    } else {
-                        console.log("ULTIMATE: No dialogs found after", maxAttempts, "attempts");
-                    }
-                    return;
-                }
-                dialog = dialogs[dialogs.length - 1];
-            }
+        const dialogText = dialog.querySelector('.modal-body')?.textContent.trim() || dialog.textContent.trim();
+        const title = dialog.querySelector('h4.modal-title')?.textContent || errorTitle || '';
 
-            const dialogText = dialog.querySelector('.modal-body')?.textContent.trim() || dialog.textContent.trim();
-            const title = dialog.querySelector('h4.modal-title')?.textContent || errorTitle || '';
+        // ABORT if this is our own explanation dialog
+        if (title.includes('Error Explanation') || title.includes('AI Error Explanation')) {
+            return false;
+        }
 
-            // ABORT if this is our own explanation dialog
-            if (title.includes('Error Explanation') || title.includes('AI Error Explanation')) {
-                console.log("ULTIMATE: Skipping explanation dialog");
-                return;
-            }
+        const isClientScriptError = dialogText.includes('Error in Client Script') ||
+            (title && title.includes('Client Script'));
 
-            const fullText = dialog.textContent;
-            const isClientScriptError = fullText.includes('Error in Client Script') ||
-                (title && title.includes('Client Script'));
-
-            const errorKeywords = [
-                'error', 'exception', 'traceback', 'failure', 'failed',
-                'validation', 'mandatory', 'permission', 'forbidden',
-                'does not exist', 'duplicate', 'data error', 'integrity',
-                'syntax', 'link validation', 'implicit commit',
-                'reference', 'type', 'network', 'timeout', 'connection',
-                'not found', 'session expired', 'cache',
-                'stock', 'accounting', 'workflow', 'print format'
-            ];
-
-            const dialogContentLower = dialogText.toLowerCase();
-            const dialogTitleLower = (title || '').toLowerCase();
-
-            const isGenericError = errorKeywords.some(keyword =>
-                dialogContentLower.includes(keyword) || dialogTitleLower.includes(keyword)
-            );
-
-            if (!isGenericError && !isClientScriptError) {
-                if (!targetDialog && attempts < maxAttempts) {
-                    setTimeout(attempt, interval);
-                }
-                return;
-            }
+        const errorKeywords = [
+            'error', 'exception', 'traceback', 'failure', 'failed',
+            'validation', 'mandatory', 'permission', 'forbidden',
+            'does not exist', 'duplicate', 'data error', 'integrity',
+            'syntax', 'link validation', 'implicit commit',
+            'reference', 'type', 'network', 'timeout', 'connection',
+            'not found', 'session expired', 'cache',
+            'stock', 'accounting', 'workflow', 'print format'
+        ];
 
-            console.log("ULTIMATE: Confirmed error dialog (ClientScript: " + isClientScriptError + "), injecting button...");
+        const dialogContentLower = dialogText.toLowerCase();
+        const dialogTitleLower = (title || '').toLowerCase();
 
-            if (forceInjectButton(dialog, errorMessage)) {
-                console.log("✓ ULTIMATE: Button injected SUCCESSFULLY on attempt", attempts);
-                window._errorDialogShown = false;
-            } else {
-                if (attempts < maxAttempts) {
-                    setTimeout(attempt, interval);
-                }
-            }
+        const isGenericError = errorKeywords.some(keyword =>
+            dialogContentLower.includes(keyword) || dialogTitleLower.includes(keyword)
+        );
 
-        } catch (error) {
-            console.error("ULTIMATE injection error:", error);
-            if (attempts < maxAttempts) {
-                setTimeout(attempt, interval);
-            }
+        if (!isGenericError && !isClientScriptError) {
+            return false;
         }
-    }
 
-    setTimeout(attempt, 100);
+        return forceInjectButton(dialog, errorMessage || dialogText);
+
+    } catch (error) {
+        console.error("ErrorEase injection error:", error);
+        return false;
+    }
 }
 
 // ========== CRITICAL FIX: Updated forceInjectButton function ==========
@@ -402,12 +237,20 @@ function forceInjectButton(dialog, errorMessage) {
             btn.style.boxShadow = '0 3px 6px rgba(0,0,0,0.16) !important';
         });
 
+        // Build request args up front so the prefetch and the click share a cache key
+        btn._erroreaseArgs = buildExplainArgs(dialog, errorMessage);
+        btn._erroreaseMessage = errorMessage;
+
         // Click handler
         btn.addEventListener('click', function (e) {
             e.preventDefault();
             e.stopPropagation();
 
-            if (!errorMessage || errorMessage.trim() === '') {
+            // Re-read the dialog in case it now shows a different error
+            refreshExplainArgs(btn, dialog, '', false);
+            const explainArgs = btn._erroreaseArgs;
+
+            if (!explainArgs.message || explainArgs.message.trim() === '') {
                 frappe.show_alert({
                     message: __('No error message found'),
                     indicator: 'orange'
@@ -421,58 +264,29 @@ function forceInjectButton(dialog, errorMessage) {
             btn.innerHTML = '<i class="fa fa-spinner fa-spin" style="margin-right: 5px"></i> Analyzing...';
             btn.style.opacity = '0.7';
 
-            // Get current context
-            const currentRoute = frappe.get_route ? frappe.get_route() : [];
-
-            // Clean error message
-            let cleanMessage = errorMessage;
-            const bodyElement = dialog.querySelector('.modal-body');
-            if (bodyElement) {
-                const lines = bodyElement.textContent.split('\n').map(l => l.trim()).filter(Boolean);
-                const tbIndex = lines.findIndex(l => l.includes('Traceback') || l.includes('Error:'));
-                if (tbIndex >= 0) {
-                    cleanMessage = lines.slice(tbIndex).join('\n');
-                } else {
-                    cleanMessage = bodyElement.textContent.trim();
-                }
-            }
-
-            // Append extra context
-            cleanMessage += `\n\nContext: ${currentRoute[1] || 'Unknown'} form, Before Save event, Server Script error`;
-
-            // Call API
-            frappe.call({
-                method: "errorease.api.explain_error",
-                args: {
-                    message: cleanMessage,
-                    doctype: (currentRoute[0] === 'Form' || currentRoute[0] === 'List') ? currentRoute[1] : null,
-                    docname: currentRoute[2] || null,
-                    route: currentRoute.join('/') || null
-                },
-                callback: (response) => {
-                    btn.disabled = false;
-                    btn.innerHTML = originalHTML;
-                    btn.style.opacity = '1';
-
-                    if (response && response.message && response.message.explanation) {
-                        window.ErrorEase.showExplanation(response.message.explanation, response.message.cached);
-                    } else {
-                        frappe.show_alert({
-                            message: __('Failed to get explanation.'),
-                            indicator: 'red'
-                        });
-                    }
-                },
-                error: () => {
-                    btn.disabled = false;
-                    btn.innerHTML = originalHTML;
-                    btn.style.opacity = '1';
+            // Served from the browser cache or the in-flight prefetch when possible
+            window.ErrorEase.fetchExplanation(explainArgs).then((message) => {
+                btn.disabled = false;
+                btn.innerHTML = originalHTML;
+                btn.style.opacity = '1';
 
+                if (message && message.explanation) {
+                    window.ErrorEase.showExplanation(message.explanation, message.cached, message.hash, message.similarity);
+                } else {
                     frappe.show_alert({
-                        message: __('ErrorEase service unavailable.'),
+                        message: __('Failed to get explanation.'),
                         indicator: 'red'
                     });
                 }
+            }).catch(() => {
+                btn.disabled = false;
+                btn.innerHTML = originalHTML;
+                btn.style.opacity = '1';
+
+                frappe.show_alert({
+                    message: __('ErrorEase service unavailable.'),
+                    indicator: 'red'
+                });
             });
         });
 
@@ -483,6 +297,11 @@ function forceInjectButton(dialog, errorMessage) {
         // Add pulsating animation
         btn.style.animation = 'errorease-pulse 2s infinite';
 
+        // Warm the explanation in the background so the click is instant
+        if (errorMessage && errorMessage.trim() !== '' && shouldPrefetch(dialog)) {
+            window.ErrorEase.prefetch(btn._erroreaseArgs);
+        }
+
         return true;
 
     } catch (error) {
@@ -491,23 +310,282 @@ function forceInjectButton(dialog, errorMessage) {
     }
 }
 
+// ========== Re-key an injected button when its dialog shows a new error ==========
+function refreshExplainArgs(btn, dialog, errorMessage = '', prefetch = true) {
+    const args = buildExplainArgs(dialog, errorMessage || btn._erroreaseMessage || '');
+    if (btn._erroreaseArgs && args.message === btn._erroreaseArgs.message) return;
+
+    btn._erroreaseArgs = args;
+    if (errorMessage) btn._erroreaseMessage = errorMessage;
+    if (prefetch && shouldPrefetch(dialog)) window.ErrorEase.prefetch(args);
+}
+
+// Prefetching costs a provider call without a click: only when enabled in
+// ErrorEase Settings, and only for real errors (red indicator or a traceback),
+// not warnings that merely mention a keyword
+function shouldPrefetch(dialog) {
+    if (!(frappe.boot && frappe.boot.errorease && frappe.boot.errorease.prefetch)) return false;
+    if (dialog.querySelector('.modal-header .indicator.red')) return true;
+    return /Traceback \(most recent call last\)/.test(dialog.querySelector('.modal-body')?.textContent || '');
+}
+
+// ========== Build explain_error args from an error dialog ==========
+function buildExplainArgs(dialog, errorMessage) {
+    // Get current context
+    const currentRoute = frappe.get_route ? frappe.get_route() : [];
+
+    // Clean error message
+    let cleanMessage = errorMessage;
+    const bodyElement = dialog.querySelector('.modal-body');
+    if (bodyElement) {
+        // Leave out our own button so the text (and cache key) is the same before and after injection
+        const body = bodyElement.cloneNode(true);
+        body.querySelectorAll('.errorease-button-wrapper, .errorease-btn').forEach(el => el.remove());
+
+        const lines = body.textContent.split('\n').map(l => l.trim()).filter(Boolean);
+        const tbIndex = lines.findIndex(l => l.includes('Traceback') || l.includes('Error:'));
+        if (tbIndex >= 0) {
+            cleanMessage = lines.slice(tbIndex).join('\n');
+        } else {
+            cleanMessage = body.textContent.trim();
+        }
+    }
+
+    // Append extra context
+    cleanMessage += `\n\nContext: ${currentRoute[1] || 'Unknown'} form, Before Save event, Server Script error`;
+
+    return {
+        message: cleanMessage,
+        doctype: (currentRoute[0] === 'Form' || currentRoute[0] === 'List') ? currentRoute[1] : null,
+        docname: currentRoute[2] || null,
+        route: currentRoute.join('/') || null
+    };
+}
+
+// ============================================================
+// Browser-side explanation cache (localStorage)
+// ============================================================
+// Request args map to the fingerprint returned by the server; explanations
+// are stored once per fingerprint, bounded by TTL, entry count and bytes.
+const ErrorEaseClientCache = {
+    storageKey: 'errorease:explanations',
+    ttl: 30 * 60 * 1000,
+    maxEntries: 50,
+    maxBytes: 256 * 1024,
+
+    requestKey: function (args) {
+        // FNV-1a over the request args, scoped to the session user
+        const text = JSON.stringify([frappe.session && frappe.session.user, args.message,
+            args.doctype, args.docname, args.route]);
+        let h = 0x811c9dc5;
+        for (let i = 0; i < text.length; i++) {
+            h ^= text.charCodeAt(i);
+            h = Math.imul(h, 0x01000193);
+        }
+        return (h >>> 0).toString(16) + ':' + text.length;
+    },
+
+    load: function () {
+        try {
+            const data = JSON.parse(localStorage.getItem(this.storageKey) || 'null');
+            if (data && data.index && data.entries) return data;
+        } catch (e) {
+            // corrupt or unavailable storage - start fresh
+        }
+        return { index: {}, entries: {} };
+    },
+
+    save: function (data) {
+        try {
+            localStorage.setItem(this.storageKey, JSON.stringify(data));
+        } catch (e) {
+            // quota exceeded or storage disabled - drop the cache
+            try { localStorage.removeItem(this.storageKey); } catch (err) { /* ignore */ }
+        }
+    },
+
+    get: function (args) {
+        const data = this.load();
+        const key = this.requestKey(args);
+        const fingerprint = data.index[key];
+        const entry = fingerprint && data.entries[fingerprint];
+        if (!entry) return null;
+
+        if (Date.now() - entry.ts > this.ttl) {
+            this.prune(data);
+            this.save(data);
+            return null;
+        }
+        return { explanation: entry.explanation, cached: true, hash: fingerprint };
+    },
+
+    set: function (args, message) {
+        // Approximate matches are refreshed server-side and shed requests only
+        // carry the local fallback; don't pin either here
+        if (!message || !message.hash || !message.explanation || message.approximate || message.shed) return;
+
+        const data = this.load();
+        data.index[this.requestKey(args)] = message.hash;
+        data.entries[message.hash] = {
+            explanation: message.explanation,
+            ts: Date.now(),
+            size: message.explanation.length
+        };
+        this.prune(data);
+        this.save(data);
+    },
+
+    prune: function (data) {
+        const now = Date.now();
+        let fingerprints = Object.keys(data.entries)
+            .filter(fp => now - data.entries[fp].ts <= this.ttl)
+            .sort((a, b) => data.entries[b].ts - data.entries[a].ts);
+
+        // Keep the newest entries within the count and byte budgets
+        let bytes = 0;
+        fingerprints = fingerprints.filter((fp, i) => {
+            bytes += data.entries[fp].size || 0;
+            return i < this.maxEntries && bytes <= this.maxBytes;
+        });
+
+        const keep = new Set(fingerprints);
+        Object.keys(data.entries).forEach(fp => { if (!keep.has(fp)) delete data.entries[fp]; });
+        Object.keys(data.index).forEach(k => { if (!keep.has(data.index[k])) delete data.index[k]; });
+    },
+
+    clear: function () {
+        try { localStorage.removeItem(this.storageKey); } catch (e) { /* ignore */ }
+    }
+};
+
 // ============================================================
 // ErrorEase Core
 // ============================================================
+// ========== Benchmark helpers ==========
+function modalEvent(frappeDialog, eventName, trigger) {
+    return new Promise((resolve) => {
+        const done = () => {
+            clearTimeout(timer);
+            resolve();
+        };
+        // Don't hang the benchmark if an animation never completes
+        const timer = setTimeout(() => {
+            frappeDialog.$wrapper.off(eventName, done);
+            resolve();
+        }, 2000);
+        frappeDialog.$wrapper.one(eventName, done);
+        trigger();
+    });
+}
+
+function nextFrame() {
+    return new Promise((resolve) => (window.requestAnimationFrame || setTimeout)(() => resolve()));
+}
+
+// Replica of the body-wide MutationObserver detection used before the
+// lifecycle hooks: the same per-mutation dialog lookup, style check and text
+// scan, timed, but without injecting anything.
+function legacyObserver() {
+    const stats = { callbacks: 0, ms: 0 };
+    const check = (node) => {
+        const dialog = node.classList?.contains('modal-dialog') ? node :
+            node.querySelector?.('.modal-dialog, .frappe-dialog, .msgprint-dialog');
+        if (!dialog) return;
+
+        const style = window.getComputedStyle(dialog.closest('.modal') || dialog);
+        if (style.display === 'none' || style.visibility === 'hidden') return;
+
+        const text = (dialog.querySelector('.modal-body')?.textContent.trim() || dialog.textContent.trim()).toLowerCase();
+        return ['error', 'exception', 'traceback', 'nameerror'].some(k => text.includes(k));
+    };
+
+    const observer = new MutationObserver((mutations) => {
+        const started = performance.now();
+        stats.callbacks++;
+        for (const mutation of mutations) {
+            if (mutation.type === 'childList') {
+                mutation.addedNodes.forEach((node) => node.nodeType === 1 && check(node));
+            } else if (mutation.type === 'attributes') {
+                check(mutation.target);
+            }
+        }
+        stats.ms += performance.now() - started;
+    });
+    observer.observe(document.body, { childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style'] });
+
+    return { stats: stats, disconnect: () => observer.disconnect() };
+}
+
 window.ErrorEase = {
-    showExplanation: function (explanation, cached = false) {
+    cache: ErrorEaseClientCache,
+    _pending: {},
+
+    // Entry point for errorease_boot.js
+    detect: function (dialog, errorMessage = '', errorTitle = '') {
+        ErrorEaseDetector.schedule(dialog, errorMessage, errorTitle);
+    },
+
+    // Resolve an explanation from the browser cache, an in-flight request or the server
+    fetchExplanation: function (args, priority = null) {
+        const hit = this.cache.get(args);
+        if (hit) return Promise.resolve(hit);
+
+        const key = this.cache.requestKey(args);
+        if (this._pending[key]) return this._pending[key];
+
+        const request = new Promise((resolve, reject) => {
+            frappe.call({
+                method: "errorease.api.explain_error",
+                args: priority ? Object.assign({ priority: priority }, args) : args,
+                callback: (response) => {
+                    const message = response && response.message;
+                    this.cache.set(args, message);
+                    resolve(message);
+                },
+                error: reject
+            });
+        }).finally(() => {
+            delete this._pending[key];
+        });
+
+        this._pending[key] = request;
+        return request;
+    },
+
+    // Prefetches queue behind interactive clicks in the server-side scheduler
+    prefetch: function (args) {
+        if (this._benchmarking) return;
+        this.fetchExplanation(args, 'prefetch').catch(() => {
+            // the click path reports failures
+        });
+    },
+
+    showExplanation: function (explanation, cached = false, errorHash = null, similarity = null) {
         // Remove unwanted sections
         explanation = explanation.replace(/💡\s*Prevention Tips[:\s\S]*/gi, '');
         explanation = explanation.replace(/Prevention Tips[:\s\S]*/gi, '');
         explanation = explanation.replace(/Tips[:\s\S]*/gi, '');
         explanation = explanation.replace(/Best Practices[:\s\S]*/gi, '');
 
-        const formattedExplanation = this.formatExplanation(explanation);
+        let formattedExplanation = this.formatExplanation(explanation);
+
+        // Shareable, HTTP-cacheable overlay page addressed by error fingerprint
+        if (errorHash) {
+            formattedExplanation += '<p style="margin-top: 12px; text-align: right;">' +
+                '<a href="/errorease/overlay/' + encodeURIComponent(errorHash) + '" target="_blank">' +
+                '<i class="fa fa-link" style="margin-right:5px"></i>' + __('Shareable link') + '</a></p>';
+        }
+
+        let title = cached
+            ? '<i class="fa fa-bolt text-warning" style="margin-right:8px"></i> Error Explanation (Cached)'
+            : '<i class="fa fa-robot text-primary" style="margin-right:8px"></i> AI Error Explanation';
+        if (similarity) {
+            title = '<i class="fa fa-clone text-warning" style="margin-right:8px"></i> Error Explanation (Similar error, ' +
+                Math.round(similarity * 100) + '% match)';
+        }
 
         const dialog = new frappe.ui.Dialog({
-            title: cached
-                ? '<i class="fa fa-bolt text-warning" style="margin-right:8px"></i> Error Explanation (Cached)'
-                : '<i class="fa fa-robot text-primary" style="margin-right:8px"></i> AI Error Explanation',
+            title: title,
             size: 'large',
             fields: [{
                 fieldname: 'explanation',
@@ -595,10 +673,77 @@ window.ErrorEase = {
         frappe.throw("Test error for ErrorEase - should show Explain Error button NOW");
     },
 
+    // Opens and closes real error and non-error dialogs and reports what
+    // detection costs per dialog, next to a replica of the DOM observer it
+    // replaced. From the console: ErrorEaseBoot.benchmark({ dialogs: 20 })
+    benchmark: async function ({ dialogs = 20 } = {}) {
+        const boot = window.ErrorEaseBoot;
+        this._benchmarking = true; // no prefetch calls for benchmark dialogs
+
+        const cycle = async () => {
+            for (let i = 0; i < dialogs; i++) {
+                const isError = i % 2 === 0;
+                const d = new frappe.ui.Dialog({
+                    title: isError ? 'Error' : 'Details',
+                    fields: [{
+                        fieldtype: 'HTML',
+                        fieldname: 'body',
+                        options: isError
+                            ? '<pre>Traceback (most recent call last):\nValidationError: ErrorEase benchmark ' + i + '</pre>'
+                            : '<p>Item ' + i + ' has been updated.</p>'
+                    }]
+                });
+                await modalEvent(d, 'shown.bs.modal', () => d.show());
+                await nextFrame(); // let the detector flush
+                await modalEvent(d, 'hidden.bs.modal', () => d.hide());
+                d.$wrapper.remove();
+            }
+        };
+
+        const measure = async (withLegacyObserver) => {
+            const handlerBefore = Object.assign({}, boot.stats);
+            const detectorBefore = Object.assign({}, ErrorEaseDetector.stats);
+            const legacy = withLegacyObserver ? legacyObserver() : null;
+
+            const started = performance.now();
+            await cycle();
+            const elapsed = performance.now() - started;
+            if (legacy) legacy.disconnect();
+
+            const handlerMs = boot.stats.ms - handlerBefore.ms;
+            const detectorMs = ErrorEaseDetector.stats.ms - detectorBefore.ms;
+            return {
+                dialogs: dialogs,
+                wall_ms: +elapsed.toFixed(2),
+                handler_calls: boot.stats.modals - handlerBefore.modals,
+                handler_matched: boot.stats.matched - handlerBefore.matched,
+                handler_ms: +handlerMs.toFixed(3),
+                detector_checks: ErrorEaseDetector.stats.checks - detectorBefore.checks,
+                detector_injections: ErrorEaseDetector.stats.injections - detectorBefore.injections,
+                detector_ms: +detectorMs.toFixed(3),
+                ms_per_dialog: +((handlerMs + detectorMs) / dialogs).toFixed(3),
+                legacy_observer_callbacks: legacy ? legacy.stats.callbacks : 0,
+                legacy_observer_ms: legacy ? +legacy.stats.ms.toFixed(3) : 0,
+                legacy_ms_per_dialog: legacy ? +(legacy.stats.ms / dialogs).toFixed(3) : 0
+            };
+        };
+
+        try {
+            const result = {
+                lifecycle: await measure(false),
+                with_legacy_observer: await measure(true)
+            };
+            console.table(result);
+            return result;
+        } finally {
+            this._benchmarking = false;
+        }
+    },
+
     debug: function () {
         console.log("=== ErrorEase Debug ===");
         console.log("Last error:", window._lastErrorEaseError);
-        console.log("Error dialog shown flag:", window._errorDialogShown);
+        console.log("Detector stats:", ErrorEaseDetector.stats);
 
         const dialogs = document.querySelectorAll('.modal-dialog, .msgprint-dialog');
         console.log("Dialogs found:", dialogs.length);
@@ -714,25 +859,3 @@ window.ErrorEase = {
     document.head.appendChild(style);
     console.log("✓ ErrorEase: ULTIMATE CSS loaded with fixed alignment");
 })();
-
-// ============================================================
-// Initialize
-// ============================================================
-if (window.frappe && frappe.ready) {
-    frappe.ready(() => {
-        console.log("✓ ErrorEase: ULTRA-READY with fixed button alignment");
-    });
-} else {
-    setTimeout(() => {
-        console.log("✓ ErrorEase: ULTRA-LOADED with fixed button alignment");
-    }, 1000);
-}
-
-// ============================================================
-// Auto-test on load (optional, remove in production)
-// ============================================================
-setTimeout(() => {
-    console.log("ErrorEase: Auto-test disabled. Use ErrorEase.test() to test.");
-    // Uncomment to auto-test on page load:
-    // ErrorEase.test();
-}, 3000);
\ No newline at end of file
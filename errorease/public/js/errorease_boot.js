@@ -0,0 +1,166 @@
+// apps/errorease/errorease/public/js/errorease_boot.js
+
+// ============================================================
+// ErrorEase bootstrap - the only script included on every desk page
+// ============================================================
+// Patches frappe.msgprint / frappe.throw and listens for shown modals.
+// The overlay, formatting and injection code (errorease.js + css) is
+// fetched with frappe.require the first time an error dialog appears.
+(function () {
+    if (!window.frappe) {
+        console.warn("ErrorEase: Frappe not available");
+        return;
+    }
+
+    const ASSETS = [
+        "/assets/errorease/js/errorease.js",
+        "/assets/errorease/css/errorease.css"
+    ];
+
+    window.ErrorEaseBoot = {
+        _loading: null,
+        // Cost of the shown.bs.modal handler below, read by ErrorEase.benchmark()
+        stats: { modals: 0, matched: 0, ms: 0 },
+
+        // Load the full module once; resolves when window.ErrorEase is ready
+        load: function () {
+            if (!this._loading) {
+                this._loading = new Promise((resolve) => {
+                    frappe.require(ASSETS, () => resolve(window.ErrorEase));
+                });
+            }
+            return this._loading;
+        },
+
+        detect: function (dialog, errorMessage = '', errorTitle = '') {
+            if (!dialog) return;
+            if (window.ErrorEase) {
+                window.ErrorEase.detect(dialog, errorMessage, errorTitle);
+                return;
+            }
+            this.load().then((ErrorEase) => ErrorEase && ErrorEase.detect(dialog, errorMessage, errorTitle));
+        },
+
+        // Console helpers; they load the full module first
+        benchmark: function (options) {
+            return this.load().then((ErrorEase) => ErrorEase.benchmark(options));
+        },
+
+        test: function () {
+            return this.load().then((ErrorEase) => ErrorEase.test());
+        },
+
+        debug: function () {
+            return this.load().then((ErrorEase) => ErrorEase.debug());
+        }
+    };
+
+    // Modal dialog element for a frappe.ui.Dialog (as returned by msgprint)
+    const dialogFor = (frappeDialog) => {
+        const wrapper = frappeDialog && frappeDialog.$wrapper && frappeDialog.$wrapper[0];
+        return wrapper ? wrapper.querySelector('.modal-dialog') : null;
+    };
+
+    // Store originals
+    window._originalMsgprint = frappe.msgprint;
+    window._originalThrow = frappe.throw;
+    window._lastErrorEaseError = null;
+
+    // ========== Patch frappe.throw ==========
+    // frappe.throw shows its dialog through frappe.msgprint, so injection
+    // happens in the msgprint patch; here we only record the error.
+    if (frappe.throw && typeof frappe.throw === 'function') {
+        frappe.throw = function (message, title = "Error", indicator = "red") {
+            window._lastErrorEaseError = {
+                message: message,
+                title: title,
+                timestamp: Date.now(),
+                source: 'throw'
+            };
+
+            return window._originalThrow.call(this, message, title, indicator);
+        };
+    }
+
+    // ========== Patch frappe.msgprint ==========
+    if (frappe.msgprint && typeof frappe.msgprint === 'function') {
+        frappe.msgprint = function (opts, ...args) {
+            const result = window._originalMsgprint.call(this, opts, ...args);
+
+            let isError = false;
+            let errorMessage = '';
+            let errorTitle = '';
+
+            if (typeof opts === 'object') {
+                errorMessage = opts.message || opts.title || '';
+                errorTitle = opts.title || '';
+
+                isError =
+                    opts.indicator === 'red' ||
+                    opts.indicator === 'orange' ||
+                    (errorTitle && errorTitle.toLowerCase().includes('error')) ||
+                    (errorMessage && errorMessage.toLowerCase().includes('error')) ||
+                    (errorTitle && errorTitle.toLowerCase().includes('server')) ||
+                    (errorMessage && errorMessage.toLowerCase().includes('exception')) ||
+                    (errorMessage && errorMessage.toLowerCase().includes('traceback')) ||
+                    (errorMessage && errorMessage.toLowerCase().includes('nameerror')) ||
+                    (errorMessage && errorMessage.toLowerCase().includes('typeerror'));
+
+            } else if (typeof opts === 'string') {
+                const lowerOpts = opts.toLowerCase();
+                isError =
+                    lowerOpts.includes('error') ||
+                    lowerOpts.includes('exception') ||
+                    lowerOpts.includes('traceback');
+                errorMessage = opts;
+            }
+
+            // Also check args
+            if (args[0] && typeof args[0] === 'object') {
+                const arg = args[0];
+                if (arg.indicator === 'red' || arg.indicator === 'orange') {
+                    isError = true;
+                }
+                if (arg.title && arg.title.toLowerCase().includes('error')) {
+                    isError = true;
+                    errorTitle = arg.title;
+                }
+            }
+
+            if (isError && errorMessage) {
+                window._lastErrorEaseError = {
+                    message: errorMessage,
+                    title: errorTitle,
+                    timestamp: Date.now(),
+                    source: 'msgprint'
+                };
+
+                // msgprint returns the dialog it rendered into
+                window.ErrorEaseBoot.detect(dialogFor(result || frappe.msg_dialog), errorMessage, errorTitle);
+            }
+
+            return result;
+        };
+    }
+
+    // ========== Dialogs shown outside msgprint (e.g. client script errors) ==========
+    if (window.jQuery) {
+        jQuery(document).on('shown.bs.modal', '.modal', function () {
+            if (this.classList.contains('errorease-explanation-dialog')) return;
+
+            const stats = window.ErrorEaseBoot.stats;
+            const started = performance.now();
+            stats.modals++;
+
+            const dialog = this.querySelector('.modal-dialog');
+            const text = (dialog && dialog.textContent || '').toLowerCase();
+            // Cheap pre-filter so non-error modals never pull in the full module
+            if (['error', 'exception', 'traceback', 'failed', 'mandatory'].some(k => text.includes(k))) {
+                stats.matched++;
+                window.ErrorEaseBoot.detect(dialog);
+            }
+
+            stats.ms += performance.now() - started;
+        });
+    }
+})();
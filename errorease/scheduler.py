@@ -0,0 +1,341 @@
+# apps/errorease/errorease/scheduler.py
+
+"""
+Fair-share scheduling in front of provider calls.
+
+State lives in the site's cache Redis so that every web and RQ worker of the
+site shares it:
+
+    errorease:sched:bucket:user:{user}   token bucket per user
+    errorease:sched:bucket:role:{role}   token bucket shared by a role
+    errorease:sched:bucket:deferred:{user}
+                                         token bucket per user for prefetches
+                                         and background analyses
+    errorease:sched:queue                sorted set of waiting tickets,
+                                         score = priority * 1e13 + enqueue ms
+    errorease:sched:active               sorted set of tickets holding a
+                                         provider slot, score = lease expiry
+    errorease:sched:shed:{ticket}        marker for a waiter that was evicted
+    errorease:sched:stats                counters for sizing
+
+A desk click first takes a token from its user bucket and from every
+configured role bucket the user holds; prefetches and background analyses
+draw on the user's separate deferred bucket, so they never use up the
+user's clicks. A request then joins the bounded queue and waits until one of
+the free provider slots is its turn. Interactive desk clicks sort ahead of
+prefetches, which sort ahead of background analyses. When the queue is full,
+the lowest-priority waiter is shed. Shed requests get the local fallback
+explanation instead of a provider call.
+
+Desk requests wait inside a web worker, so they fail fast: only a quarter of
+the bench's gunicorn workers may wait at once, a click waits at most
+INTERACTIVE_MAX_WAIT seconds, and a prefetch never waits. Background jobs
+wait in RQ workers and may queue longer. The asyncio dispatcher does not go
+through the scheduler; while the scheduler is enabled, background analyses
+are run as RQ jobs instead (see dispatcher.submit).
+
+A waiter always takes its ticket out of the queue when it leaves, and
+tickets older than the longest possible wait are swept on every enqueue and
+poll, so a worker that dies while waiting cannot block the queue.
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+from errorease.cache import _client, _key
+
+INTERACTIVE = 0
+PREFETCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PREFETCH: "prefetch", BACKGROUND: "background"}
+
+PRIORITY_FACTOR = 10**13
+POLL_SECONDS = 0.025
+LEASE_SECONDS = 120
+SHED_MARKER_SECONDS = 60
+BACKGROUND_WAIT_FACTOR = 3
+INTERACTIVE_MAX_WAIT = 5
+# Share of the web workers that may sit waiting for a slot, and the worker
+# count assumed when gunicorn_workers is not in the bench config
+WEB_WAITER_SHARE = 4
+DEFAULT_WEB_WORKERS = 4
+
+QUEUE_KEY = "errorease:sched:queue"
+ACTIVE_KEY = "errorease:sched:active"
+STATS_KEY = "errorease:sched:stats"
+SHED_KEY = "errorease:sched:shed:{ticket}"
+USER_BUCKET_KEY = "errorease:sched:bucket:user:{user}"
+ROLE_BUCKET_KEY = "errorease:sched:bucket:role:{role}"
+DEFERRED_BUCKET_KEY = "errorease:sched:bucket:deferred:{user}"
+
+DEFAULTS = {
+    "user_requests_per_minute": 20,
+    "user_burst": 5,
+    "max_concurrent_calls": 8,
+    "max_queue_length": 50,
+    "max_queue_wait": 15,
+}
+
+# KEYS: bucket keys; ARGV: now, then (rate per second, burst) per key.
+# Takes one token from every bucket, or from none of them.
+TAKE_TOKENS = """
+local now = tonumber(ARGV[1])
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    if tokens < 1 then
+        return 0
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 60)
+end
+return 1
+"""
+
+# Removes tickets enqueued before ARGV[n] (ms) from every priority band of KEYS[1]
+SWEEP = """
+local function sweep(queue, cutoff)
+    local priority_factor = 10000000000000
+    for priority = 0, 2 do
+        local low = priority * priority_factor
+        redis.call('ZREMRANGEBYSCORE', queue, low, low + cutoff)
+    end
+end
+"""
+
+# KEYS: queue, shed marker prefix; ARGV: ticket, score, max length, marker ttl, stale cutoff ms,
+# max web waiters. Returns 1 if queued, 0 if the new ticket itself is shed, -1 if it is a
+# desk request and too many web workers are already waiting.
+ENQUEUE = SWEEP + """
+sweep(KEYS[1], tonumber(ARGV[5]))
+local priority_factor = 10000000000000
+local new_priority = math.floor(tonumber(ARGV[2]) / priority_factor)
+if new_priority < 2 and redis.call('ZCOUNT', KEYS[1], 0, 2 * priority_factor - 1) >= tonumber(ARGV[6]) then
+    return -1
+end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+    local last_priority = math.floor(tonumber(last[2]) / priority_factor)
+    if new_priority >= last_priority then
+        return 0
+    end
+    redis.call('ZREM', KEYS[1], last[1])
+    redis.call('SET', KEYS[2] .. last[1], 1, 'EX', tonumber(ARGV[4]))
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+# KEYS: queue, active; ARGV: ticket, now, max concurrent, lease expiry, stale cutoff ms.
+# Grants a slot to the ticket if it is among the first `free slots` waiters.
+ACQUIRE = SWEEP + """
+sweep(KEYS[1], tonumber(ARGV[5]))
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+if not rank then
+    return 0
+end
+if rank >= tonumber(ARGV[3]) - redis.call('ZCARD', KEYS[2]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+return 1
+"""
+
+
+class Shed(Exception):
+    """The request was not given a provider slot; serve the local fallback"""
+
+
+def _setting(settings, fieldname):
+    return cint(getattr(settings, fieldname, None)) or DEFAULTS[fieldname]
+
+
+def current_priority(requested=None):
+    """Desk requests are interactive unless they ask to be a prefetch; jobs are background"""
+    if getattr(frappe.local, "request", None) is None:
+        return BACKGROUND
+    if requested == "prefetch":
+        return PREFETCH
+    return INTERACTIVE
+
+
+def _buckets(settings, user, priority=INTERACTIVE):
+    """(key, tokens per second, burst) for the user and each limited role they hold"""
+    rate = _setting(settings, "user_requests_per_minute") / 60.0
+    burst = _setting(settings, "user_burst")
+    if priority != INTERACTIVE:
+        # Deferred work has its own bucket, so it cannot rate-limit desk clicks
+        return [(_key(DEFERRED_BUCKET_KEY.format(user=user)), rate, burst)]
+
+    buckets = [(_key(USER_BUCKET_KEY.format(user=user)), rate, burst)]
+
+    roles = set(frappe.get_roles(user))
+    for row in getattr(settings, "role_limits", None) or []:
+        if row.role in roles and cint(row.requests_per_minute) > 0:
+            buckets.append((
+                _key(ROLE_BUCKET_KEY.format(role=row.role)),
+                cint(row.requests_per_minute) / 60.0,
+                cint(row.burst) or 1,
+            ))
+    return buckets
+
+
+@contextmanager
+def slot(settings, priority):
+    """Hold a provider slot for the duration of the block, or raise Shed"""
+    if not getattr(settings, "scheduler_enabled", False):
+        yield
+        return
+
+    try:
+        ticket = _admit(settings, priority)
+    except Shed:
+        raise
+    except Exception as e:
+        # Scheduler state unavailable (e.g. Redis error): don't block explanations
+        frappe.logger("errorease").warning(f"ErrorEase scheduler unavailable, admitting without a slot: {e}")
+        ticket = None
+
+    try:
+        yield
+    finally:
+        if ticket:
+            try:
+                _client().zrem(_key(ACTIVE_KEY), ticket)
+            except Exception:
+                # The lease expires on its own
+                pass
+
+
+def _max_wait(settings, priority):
+    """Seconds a request of `priority` may wait for a slot"""
+    max_wait = _setting(settings, "max_queue_wait")
+    if priority == BACKGROUND:
+        return max_wait * BACKGROUND_WAIT_FACTOR
+    if priority == PREFETCH:
+        return 0
+    return min(max_wait, INTERACTIVE_MAX_WAIT)
+
+
+def _max_web_waiters():
+    """Desk requests that may hold a web worker while waiting for a slot"""
+    workers = cint(frappe.conf.get("gunicorn_workers")) or DEFAULT_WEB_WORKERS
+    return max(1, workers // WEB_WAITER_SHARE)
+
+
+def _stale_cutoff_ms(settings, now):
+    """Enqueue time (ms) before which no live waiter can still be queued"""
+    return int((now - _max_wait(settings, BACKGROUND) - 1) * 1000)
+
+
+def _admit(settings, priority):
+    """Take tokens, queue and wait for a slot; returns the ticket holding it"""
+    client = _client()
+    stats_key = _key(STATS_KEY)
+    name = PRIORITY_NAMES[priority]
+
+    # Per-user and per-role token buckets
+    buckets = _buckets(settings, frappe.session.user, priority)
+    args = [time.time()]
+    for _bucket_key, rate, burst in buckets:
+        args += [rate, burst]
+    if not client.eval(TAKE_TOKENS, len(buckets), *[b[0] for b in buckets], *args):
+        client.hincrby(stats_key, "rate_limited", 1)
+        raise Shed("rate_limited")
+
+    # Bounded priority queue
+    ticket = uuid.uuid4().hex
+    queue_key, active_key = _key(QUEUE_KEY), _key(ACTIVE_KEY)
+    shed_key = _key(SHED_KEY.format(ticket=ticket))
+    enqueued = time.time()
+    score = priority * PRIORITY_FACTOR + int(enqueued * 1000)
+    queued = client.eval(
+        ENQUEUE, 2, queue_key, _key(SHED_KEY.format(ticket="")),
+        ticket, score, _setting(settings, "max_queue_length"), SHED_MARKER_SECONDS,
+        _stale_cutoff_ms(settings, enqueued), _max_web_waiters(),
+    )
+    if queued != 1:
+        client.hincrby(stats_key, f"shed_{name}", 1)
+        raise Shed("busy" if queued == -1 else "queue_full")
+
+    # Wait for our turn at a free slot; background work may wait longer, prefetches not at all
+    deadline = enqueued + _max_wait(settings, priority)
+    max_concurrent = _setting(settings, "max_concurrent_calls")
+    admitted = False
+    try:
+        while True:
+            now = time.time()
+            if client.eval(
+                ACQUIRE, 2, queue_key, active_key,
+                ticket, now, max_concurrent, now + LEASE_SECONDS, _stale_cutoff_ms(settings, now),
+            ):
+                admitted = True
+                break
+            if client.exists(shed_key):
+                client.hincrby(stats_key, f"shed_{name}", 1)
+                raise Shed("evicted")
+            if now > deadline:
+                client.hincrby(stats_key, f"timeout_{name}", 1)
+                raise Shed("timeout")
+            time.sleep(POLL_SECONDS)
+    finally:
+        # Leave the queue on every exit, including errors and job timeouts
+        if not admitted:
+            client.zrem(queue_key, ticket)
+
+    wait_ms = int((time.time() - enqueued) * 1000)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(stats_key, f"admitted_{name}", 1)
+        pipe.hincrby(stats_key, f"wait_ms_{name}", wait_ms)
+        pipe.execute()
+    except Exception:
+        # The slot is ours; losing a counter must not leak it
+        pass
+    return ticket
+
+
+def stats():
+    client = _client()
+    queue_key = _key(QUEUE_KEY)
+    now = time.time()
+
+    client.zremrangebyscore(_key(ACTIVE_KEY), "-inf", now)
+    counters = {k.decode(): int(v) for k, v in client.hgetall(_key(STATS_KEY)).items()}
+
+    by_priority = {}
+    for priority, name in PRIORITY_NAMES.items():
+        admitted = counters.get(f"admitted_{name}", 0)
+        low = priority * PRIORITY_FACTOR
+        by_priority[name] = {
+            "queued": client.zcount(queue_key, low, low + PRIORITY_FACTOR - 1),
+            "admitted": admitted,
+            "avg_wait_ms": round(counters.get(f"wait_ms_{name}", 0) / admitted, 1) if admitted else 0,
+            "shed": counters.get(f"shed_{name}", 0),
+            "timed_out": counters.get(f"timeout_{name}", 0),
+        }
+
+    head = client.zrange(queue_key, 0, 0, withscores=True)
+    return {
+        "queue_depth": client.zcard(queue_key),
+        "active_calls": client.zcard(_key(ACTIVE_KEY)),
+        "head_wait_ms": int(now * 1000 - head[0][1] % PRIORITY_FACTOR) if head else 0,
+        "rate_limited": counters.get("rate_limited", 0),
+        "by_priority": by_priority,
+    }
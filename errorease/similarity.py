@@ -0,0 +1,145 @@
+# apps/errorease/errorease/similarity.py
+
+"""
+Near-duplicate error index.
+
+Each explained error gets a 64-bit SimHash over the tokens of its redacted
+text (unigrams and bigrams, numbers dropped), with exception class names
+weighted up so different kinds of errors never look alike. The hash is split
+into four 16-bit bands; every band value is a small Redis set of
+fingerprints. Bands are keyed by a scope (DocType, provider and model, see
+api._similarity_scope), so an error is only ever matched with errors of the
+same DocType explained by the same model. A lookup probes each band value and its 16 one-bit neighbours,
+which by pigeonhole finds every hash within Hamming distance 7 (similarity
+0.89). That is one pipelined round trip plus one MGET over a handful of
+candidates, independent of how many errors are indexed. Hashing only reads
+the tail of the text and its most frequent tokens, so its cost stays flat
+however long the traceback is.
+
+    errorease:sim:{scope}:{band}:{value}  set     fingerprints with that band value
+    errorease:sim:h:{fingerprint}         string  the fingerprint's SimHash
+
+Both expire together with the explanation they point to. Their memory is
+counted against the site's cache budget (see cache.py); evicting the hash
+key takes a fingerprint out of every lookup.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from itertools import pairwise
+
+from errorease import cache
+from errorease.cache import _client, _key
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_CANDIDATES = 64
+EXCEPTION_WEIGHT = 8
+# Hashing cost grows with the text; a traceback's tail names the exception
+# and the failing code, which is what near-duplicates share
+MAX_CHARS = 1500
+MAX_FEATURES = 128
+# A fingerprint's share of a band set: the member plus set bookkeeping
+BAND_MEMBER_OVERHEAD = 48
+
+BAND_KEY = "errorease:sim:{scope}:{band}:{value:04x}"
+HASH_KEY = "errorease:sim:h:{fingerprint}"
+
+TOKEN_PATTERN = re.compile(r"[a-z_][a-z0-9_]+")
+EXCEPTION_PATTERN = re.compile(r"\b([a-z]*(?:error|exception))\b")
+STOPWORDS = {"the", "and", "for", "not", "in", "of", "to", "is", "line", "file", "redacted_path"}
+
+
+def tokens(text):
+    words = [w for w in TOKEN_PATTERN.findall(str(text or "").lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in pairwise(words)]
+
+
+def simhash(text):
+    text = str(text or "")[-MAX_CHARS:]
+    features = dict(Counter(tokens(text)).most_common(MAX_FEATURES))
+    for name in EXCEPTION_PATTERN.findall(text.lower()):
+        key = "exc:" + name
+        features[key] = features.get(key, 0) + EXCEPTION_WEIGHT
+
+    hashed = [
+        (int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big"), count)
+        for token, count in features.items()
+    ]
+
+    value = 0
+    for bit in range(BITS):
+        if sum(count if h >> bit & 1 else -count for h, count in hashed) > 0:
+            value |= 1 << bit
+    return value
+
+
+def similarity(a, b):
+    return 1 - (a ^ b).bit_count() / BITS
+
+
+def _bands(value):
+    return [(band, value >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS)]
+
+
+def add(fingerprint, value, expires_in_sec, budget_mb=None, scope=""):
+    hash_key = HASH_KEY.format(fingerprint=fingerprint)
+    pipe = _client().pipeline(transaction=False)
+    for band, band_value in _bands(value):
+        band_key = _key(BAND_KEY.format(scope=scope, band=band, value=band_value))
+        pipe.sadd(band_key, fingerprint)
+        pipe.expire(band_key, expires_in_sec)
+    pipe.set(_key(hash_key), str(value), ex=expires_in_sec)
+    pipe.execute()
+
+    cache.track(
+        hash_key,
+        len(str(value)) + BANDS * (len(fingerprint) + BAND_MEMBER_OVERHEAD),
+        expires_in_sec,
+        budget_mb,
+    )
+
+
+def lookup(value, threshold, scope=""):
+    """Return (fingerprint, similarity) of the closest indexed error in `scope`, or (None, 0)"""
+    client = _client()
+    pipe = client.pipeline(transaction=False)
+    for band, band_value in _bands(value):
+        # Multi-probe: the band value itself and every value one bit away
+        for probe in [band_value] + [band_value ^ (1 << bit) for bit in range(BAND_BITS)]:
+            pipe.srandmember(_key(BAND_KEY.format(scope=scope, band=band, value=probe)), MAX_CANDIDATES)
+
+    candidates = list({fp.decode() for members in pipe.execute() for fp in members})
+    if not candidates:
+        return None, 0
+
+    hashes = client.mget([_key(HASH_KEY.format(fingerprint=fp)) for fp in candidates])
+
+    best, best_score = None, 0
+    for fingerprint, stored in zip(candidates, hashes, strict=True):
+        if stored is None:
+            continue
+        score = similarity(value, int(stored))
+        if score > best_score:
+            best, best_score = fingerprint, score
+
+    if best_score < threshold:
+        return None, 0
+    return best, round(best_score, 4)
+
+
+def remove(fingerprint, scope=""):
+    """Drop a fingerprint whose explanation is gone"""
+    client = _client()
+    hash_key = _key(HASH_KEY.format(fingerprint=fingerprint))
+    stored = client.get(hash_key)
+
+    pipe = client.pipeline(transaction=False)
+    if stored is not None:
+        for band, band_value in _bands(int(stored)):
+            pipe.srem(_key(BAND_KEY.format(scope=scope, band=band, value=band_value)), fingerprint)
+    pipe.delete(hash_key)
+    pipe.execute()
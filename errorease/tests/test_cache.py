@@ -0,0 +1,94 @@
+# Copyright (c) 2026, memoona and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from errorease import cache
+
+BUSY = b"errorease-test-busy|"
+SMALL = b"errorease-test-small|"
+ENTRY = 100 * 1024
+
+
+class TestCacheAccounting(FrappeTestCase):
+	def setUp(self):
+		# Private bench-level keys, so real sites' usage does not leak into the budgets
+		self.patches = [
+			patch.object(cache, "BENCH_KEY", "errorease:test:bench"),
+			patch.object(cache, "USAGE_KEY", "errorease:test:usage"),
+			patch.dict(frappe.conf, {"errorease_bench_cache_mb": 1}),
+		]
+		for p in self.patches:
+			p.start()
+		self.client = cache._client()
+		self.clear()
+
+	def tearDown(self):
+		self.clear()
+		for p in reversed(self.patches):
+			p.stop()
+
+	def clear(self):
+		keys = [cache._key(cache.BENCH_KEY, shared=True), cache._key(cache.USAGE_KEY, shared=True)]
+		for namespace in (BUSY, SMALL):
+			keys += [cache._index_key(namespace, k) for k in (cache.LRU_KEY, cache.SIZES_KEY, cache.HITS_KEY, cache.BYTES_KEY)]
+		self.client.delete(*keys)
+
+	def write(self, namespace, index, nbytes=ENTRY, expires_in_sec=600, budget=10 * 1024 * 1024):
+		name = namespace + f"entry:{index}".encode()
+		cache._account(self.client, namespace, name, nbytes, expires_in_sec, budget)
+		return name
+
+	def entries(self, namespace):
+		return self.client.zcard(cache._index_key(namespace, cache.LRU_KEY))
+
+	def namespace_bytes(self, namespace):
+		return int(self.client.get(cache._index_key(namespace, cache.BYTES_KEY)) or 0)
+
+	def test_size_and_window_accounting(self):
+		name = self.write(SMALL, 1, nbytes=1000, expires_in_sec=600)
+		size = 1000 + 3 * len(name) + cache.ENTRY_OVERHEAD
+		stored = self.client.hget(cache._index_key(SMALL, cache.SIZES_KEY), name)
+		self.assertEqual(cache._parse_size(stored), (size, cache._window(600)))
+		self.assertEqual(self.namespace_bytes(SMALL), size)
+		self.assertEqual(cache.bench_bytes(self.client), size)
+
+		# Rewriting an entry replaces its size and moves it to its new window
+		self.write(SMALL, 1, nbytes=2000, expires_in_sec=60)
+		size = 2000 + 3 * len(name) + cache.ENTRY_OVERHEAD
+		self.assertEqual(self.namespace_bytes(SMALL), size)
+		self.assertEqual(cache.bench_bytes(self.client), size)
+
+	def test_expired_windows_stop_counting(self):
+		bench_key = cache._key(cache.BENCH_KEY, shared=True)
+		self.client.hincrby(bench_key, cache._window() - 1, 5000)
+		self.write(SMALL, 1, nbytes=1000)
+
+		self.assertLess(cache.bench_bytes(self.client), 5000)
+		self.assertFalse(self.client.hexists(bench_key, cache._window() - 1))
+
+	def test_namespace_budget_evicts_least_recently_used(self):
+		budget = 3 * ENTRY + 3 * 1024
+		names = [self.write(SMALL, i, budget=budget) for i in range(5)]
+
+		lru = cache._index_key(SMALL, cache.LRU_KEY)
+		self.assertEqual(self.entries(SMALL), 3)
+		self.assertIsNone(self.client.zscore(lru, names[0]))
+		self.assertIsNotNone(self.client.zscore(lru, names[-1]))
+		self.assertLessEqual(self.namespace_bytes(SMALL), budget)
+
+	def test_bench_budget_trims_the_largest_namespace(self):
+		for i in range(9):
+			self.write(BUSY, i)
+		for i in range(3):
+			self.write(SMALL, i)
+
+		# The small site keeps what it wrote; the busy one makes room
+		self.assertEqual(self.entries(SMALL), 3)
+		self.assertLess(self.entries(BUSY), 9)
+		self.assertLessEqual(cache.bench_bytes(self.client), cache.bench_budget_bytes())
+		usage = self.client.zscore(cache._key(cache.USAGE_KEY, shared=True), BUSY)
+		self.assertEqual(int(usage), self.namespace_bytes(BUSY))
@@ -0,0 +1,174 @@
+# Copyright (c) 2026, memoona and Contributors
+# See license.txt
+
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from errorease import scheduler
+
+
+class TestScheduler(FrappeTestCase):
+	def setUp(self):
+		frappe.set_user("Administrator")
+		self.client = scheduler._client()
+		self.queue = scheduler._key(scheduler.QUEUE_KEY)
+		self.active = scheduler._key(scheduler.ACTIVE_KEY)
+		self.shed_prefix = scheduler._key(scheduler.SHED_KEY.format(ticket=""))
+		self.bucket = scheduler._key(scheduler.USER_BUCKET_KEY.format(user="Administrator"))
+		self.deferred = scheduler._key(scheduler.DEFERRED_BUCKET_KEY.format(user="Administrator"))
+		self.client.delete(self.queue, self.active, self.bucket, self.deferred, scheduler._key(scheduler.STATS_KEY))
+
+	def tearDown(self):
+		self.client.delete(self.queue, self.active, self.bucket, self.deferred)
+		frappe.set_user("Administrator")
+
+	def settings(self, **overrides):
+		settings = frappe._dict(
+			scheduler_enabled=1,
+			user_requests_per_minute=60,
+			user_burst=100,
+			max_concurrent_calls=2,
+			max_queue_length=10,
+			max_queue_wait=1,
+			role_limits=[],
+		)
+		settings.update(overrides)
+		return settings
+
+	def enqueue(self, ticket, priority, max_length, now_ms=None, web_waiters=100):
+		now_ms = now_ms or int(time.time() * 1000)
+		return self.client.eval(
+			scheduler.ENQUEUE, 2, self.queue, self.shed_prefix,
+			ticket, priority * scheduler.PRIORITY_FACTOR + now_ms, max_length,
+			scheduler.SHED_MARKER_SECONDS, now_ms - 60_000, web_waiters,
+		)
+
+	def acquire(self, ticket, max_concurrent):
+		now = time.time()
+		return self.client.eval(
+			scheduler.ACQUIRE, 2, self.queue, self.active,
+			ticket, now, max_concurrent, now + scheduler.LEASE_SECONDS, int((now - 60) * 1000),
+		)
+
+	def test_token_bucket_limits_burst(self):
+		settings = self.settings(user_requests_per_minute=1, user_burst=3)
+		for _i in range(3):
+			with scheduler.slot(settings, scheduler.INTERACTIVE):
+				pass
+
+		with self.assertRaises(scheduler.Shed) as shed:
+			with scheduler.slot(settings, scheduler.INTERACTIVE):
+				pass
+		self.assertEqual(str(shed.exception), "rate_limited")
+
+	def test_deferred_work_does_not_use_up_clicks(self):
+		settings = self.settings(user_requests_per_minute=1, user_burst=2)
+		for priority in (scheduler.PREFETCH, scheduler.BACKGROUND):
+			with scheduler.slot(settings, priority):
+				pass
+
+		with self.assertRaises(scheduler.Shed):
+			with scheduler.slot(settings, scheduler.BACKGROUND):
+				pass
+
+		# The deferred bucket is empty, the user's own bucket is untouched
+		for _i in range(2):
+			with scheduler.slot(settings, scheduler.INTERACTIVE):
+				pass
+
+	def test_take_tokens_is_all_or_nothing(self):
+		other = scheduler._key("errorease:sched:bucket:test")
+		self.client.hset(other, mapping={"tokens": 0, "ts": time.time()})
+		try:
+			taken = self.client.eval(
+				scheduler.TAKE_TOKENS, 2, self.bucket, other, time.time(), 1, 5, 0.001, 1
+			)
+			self.assertEqual(taken, 0)
+			self.assertFalse(self.client.exists(self.bucket))
+		finally:
+			self.client.delete(other)
+
+	def test_enqueue_sheds_lowest_priority(self):
+		self.assertEqual(self.enqueue("b1", scheduler.BACKGROUND, 2), 1)
+		self.assertEqual(self.enqueue("b2", scheduler.BACKGROUND, 2), 1)
+
+		# A full queue makes room for higher priority work by shedding the newest background ticket
+		self.assertEqual(self.enqueue("i1", scheduler.INTERACTIVE, 2), 1)
+		self.assertIsNone(self.client.zscore(self.queue, "b2"))
+		self.assertTrue(self.client.exists(self.shed_prefix + b"b2"))
+
+		# ...but never for work of the same or lower priority
+		self.assertEqual(self.enqueue("b3", scheduler.BACKGROUND, 2), 0)
+		self.assertEqual(self.client.zcard(self.queue), 2)
+		self.client.delete(self.shed_prefix + b"b2")
+
+	def test_enqueue_bounds_web_waiters(self):
+		self.assertEqual(self.enqueue("i1", scheduler.INTERACTIVE, 10, web_waiters=2), 1)
+		self.assertEqual(self.enqueue("p1", scheduler.PREFETCH, 10, web_waiters=2), 1)
+
+		# Desk requests fail fast once the web waiters are used up; background jobs still queue
+		self.assertEqual(self.enqueue("i2", scheduler.INTERACTIVE, 10, web_waiters=2), -1)
+		self.assertEqual(self.enqueue("b1", scheduler.BACKGROUND, 10, web_waiters=2), 1)
+		self.assertEqual(self.client.zcard(self.queue), 3)
+
+	def test_desk_waits_follow_worker_count(self):
+		with patch.dict(frappe.conf, {"gunicorn_workers": 17}):
+			self.assertEqual(scheduler._max_web_waiters(), 4)
+		with patch.dict(frappe.conf, {"gunicorn_workers": 2}):
+			self.assertEqual(scheduler._max_web_waiters(), 1)
+
+		settings = self.settings(max_queue_wait=15)
+		self.assertEqual(scheduler._max_wait(settings, scheduler.INTERACTIVE), scheduler.INTERACTIVE_MAX_WAIT)
+		self.assertEqual(scheduler._max_wait(settings, scheduler.PREFETCH), 0)
+		self.assertEqual(scheduler._max_wait(settings, scheduler.BACKGROUND), 45)
+
+	def test_prefetch_does_not_wait(self):
+		settings = self.settings(max_concurrent_calls=1, max_queue_wait=10)
+		self.client.zadd(self.active, {"running": time.time() + 60})
+
+		start = time.time()
+		with self.assertRaises(scheduler.Shed) as shed:
+			with scheduler.slot(settings, scheduler.PREFETCH):
+				self.fail("admitted past the concurrency limit")
+		self.assertEqual(str(shed.exception), "timeout")
+		self.assertLess(time.time() - start, 1)
+		self.assertEqual(self.client.zcard(self.queue), 0)
+
+	def test_acquire_ranks_by_free_slots(self):
+		self.client.zadd(self.active, {"running": time.time() + 60})
+		self.enqueue("first", scheduler.BACKGROUND, 10)
+		self.enqueue("urgent", scheduler.INTERACTIVE, 10)
+
+		# One of two slots is free: only the head of the queue (by priority) gets it
+		self.assertEqual(self.acquire("first", 2), 0)
+		self.assertEqual(self.acquire("urgent", 2), 1)
+		self.assertEqual(self.acquire("first", 2), 0)
+		self.assertEqual(self.client.zcard(self.active), 2)
+
+	def test_acquire_sweeps_stale_waiters(self):
+		stale_ms = int((time.time() - 600) * 1000)
+		self.enqueue("dead", scheduler.INTERACTIVE, 10, now_ms=stale_ms)
+		self.enqueue("live", scheduler.BACKGROUND, 10)
+
+		self.assertEqual(self.acquire("live", 1), 1)
+		self.assertEqual(self.client.zcard(self.queue), 0)
+
+	def test_waiter_times_out_and_leaves_queue(self):
+		settings = self.settings(max_concurrent_calls=1, max_queue_wait=1)
+		self.client.zadd(self.active, {"running": time.time() + 60})
+
+		with self.assertRaises(scheduler.Shed) as shed:
+			with scheduler.slot(settings, scheduler.INTERACTIVE):
+				self.fail("admitted past the concurrency limit")
+
+		self.assertEqual(str(shed.exception), "timeout")
+		self.assertEqual(self.client.zcard(self.queue), 0)
+
+		# The slot frees up: the next request is admitted and releases it afterwards
+		self.client.delete(self.active)
+		with scheduler.slot(settings, scheduler.INTERACTIVE):
+			self.assertEqual(self.client.zcard(self.active), 1)
+		self.assertEqual(self.client.zcard(self.active), 0)
@@ -0,0 +1,67 @@
+# Copyright (c) 2026, memoona and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from errorease import api
+
+STANDARD_APPS = {"frappe", "erpnext"}
+
+TRACEBACK = """Traceback (most recent call last):
+  File "/home/frappe/frappe-bench/apps/frappe/frappe/app.py", line 114, in application
+    response = frappe.api.handle(request)
+               ^^^^^^^^^^^^^^^^^^^^^^^^^^
+  File "/home/frappe/frappe-bench/apps/frappe/frappe/desk/doctype/todo/todo.py", line 40, in validate
+    {source}
+{error}"""
+
+
+def traceback(error, source="self.run()"):
+	return TRACEBACK.format(source=source, error=error)
+
+
+class TestShareable(FrappeTestCase):
+	def setUp(self):
+		api._schema_memo.clear()
+
+	def shareable(self, message, doctype=None, docname=None):
+		return api._is_shareable(message, doctype, docname, STANDARD_APPS)
+
+	def test_code_identifiers_need_a_standard_frame(self):
+		for error in (
+			"NameError: name 'acme_secret_customer' is not defined",
+			"KeyError: 'acme_customer_42'",
+			"ModuleNotFoundError: No module named 'acme_private.client_x'",
+		):
+			self.assertFalse(self.shareable(error), error)
+			self.assertTrue(self.shareable(traceback(error)), error)
+
+	def test_schema_templates_without_frames(self):
+		self.assertTrue(self.shareable("Value missing for ToDo: Description"))
+		self.assertTrue(self.shareable("Insufficient Permission for ToDo"))
+
+	def test_document_values_are_private(self):
+		self.assertFalse(self.shareable("Could not find Customer: ACME Corp"))
+		self.assertFalse(self.shareable("Duplicate name ACME Corp"))
+		self.assertFalse(self.shareable(traceback("ValidationError: Customer ACME Corp is disabled")))
+		self.assertFalse(
+			self.shareable(traceback("KeyError: 'status'", source="get('TODO-0001')"), docname="TODO-0001")
+		)
+
+	def test_site_frames_are_private(self):
+		error = "NameError: name 'frape' is not defined"
+		self.assertFalse(self.shareable(traceback(error).replace("apps/frappe/frappe/desk", "apps/acme/acme/desk")))
+		self.assertFalse(
+			self.shareable(f'  File "<serverscript>", line 2, in <module>\n    frape.throw()\n{error}')
+		)
+
+	def test_custom_doctypes_and_fields_are_private(self):
+		error = traceback("AttributeError: 'ToDo' object has no attribute 'custom_zone'")
+		self.assertTrue(self.shareable(error))
+
+		with patch.object(api, "_is_standard_field", return_value=False):
+			self.assertFalse(self.shareable(error))
+		with patch.object(api, "_is_standard_doctype", return_value=False):
+			self.assertFalse(self.shareable(error))
@@ -0,0 +1,95 @@
+# Copyright (c) 2026, memoona and Contributors
+# See license.txt
+
+import time
+
+from frappe.tests.utils import FrappeTestCase
+
+from errorease import similarity
+
+TRACEBACK = """Traceback (most recent call last):
+  File "apps/frappe/frappe/app.py", line 114, in application
+    response = frappe.api.handle(request)
+  File "apps/erpnext/erpnext/stock/stock_ledger.py", line 212, in make_entry
+    sle.insert()
+  File "apps/frappe/frappe/model/document.py", line 301, in insert
+    self.run_before_save_methods()
+frappe.exceptions.ValidationError: Row 3: Qty cannot be negative for Item ITEM-0042
+"""
+
+SCOPE = "errorease-test"
+
+
+def _flip(value, bits):
+	for bit in bits:
+		value ^= 1 << bit
+	return value
+
+
+class TestSimHash(FrappeTestCase):
+	def test_simhash_is_stable_and_exception_aware(self):
+		value = similarity.simhash(TRACEBACK)
+		self.assertEqual(value, similarity.simhash(TRACEBACK))
+		self.assertLess(value, 1 << similarity.BITS)
+
+		# Same failure on another row and item stays close; another exception does not
+		near = similarity.simhash(TRACEBACK.replace("Row 3", "Row 7").replace("0042", "0107"))
+		other = similarity.simhash(TRACEBACK.replace("ValidationError", "PermissionError"))
+		self.assertGreaterEqual(similarity.similarity(value, near), 0.85)
+		self.assertLess(similarity.similarity(value, other), similarity.similarity(value, near))
+
+	def test_simhash_cost_is_bounded(self):
+		# Only the tail is hashed: whatever precedes it does not change the hash
+		text = TRACEBACK * 5
+		self.assertGreater(len(text), similarity.MAX_CHARS)
+		self.assertEqual(similarity.simhash("frame " * 5000 + text), similarity.simhash(text))
+
+		start = time.perf_counter()
+		similarity.simhash(TRACEBACK * 50)
+		self.assertLess(time.perf_counter() - start, 0.05)
+
+	def test_similarity_and_bands(self):
+		value = 0x0123_4567_89AB_CDEF
+		self.assertEqual(similarity.similarity(value, value), 1)
+		self.assertEqual(similarity.similarity(value, _flip(value, range(8))), 1 - 8 / 64)
+		self.assertEqual(similarity.similarity(0, (1 << 64) - 1), 0)
+
+		bands = similarity._bands(value)
+		self.assertEqual([band for band, _ in bands], [0, 1, 2, 3])
+		self.assertEqual(sum(band_value << (band * similarity.BAND_BITS) for band, band_value in bands), value)
+
+
+class TestSimilarityIndex(FrappeTestCase):
+	def setUp(self):
+		self.fingerprints = []
+
+	def tearDown(self):
+		for fingerprint in self.fingerprints:
+			similarity.remove(fingerprint, scope=SCOPE)
+
+	def add(self, fingerprint, value, scope=SCOPE):
+		self.fingerprints.append(fingerprint)
+		similarity.add(fingerprint, value, 60, budget_mb=10, scope=scope)
+
+	def test_lookup_finds_everything_within_distance_seven(self):
+		value = 0x0123_4567_89AB_CDEF
+		self.add("errorease-test-base", value)
+
+		# Distance 7 spread 2/2/2/1 over the bands: only a one-bit probe of the last band matches
+		probe = _flip(value, [0, 1, 16, 17, 32, 33, 48])
+		fingerprint, score = similarity.lookup(probe, 0.89, scope=SCOPE)
+		self.assertEqual(fingerprint, "errorease-test-base")
+		self.assertEqual(score, round(1 - 7 / 64, 4))
+
+		# Distance 8 at two bits per band is past both the probes and the threshold
+		self.assertEqual(similarity.lookup(_flip(probe, [49]), 0.89, scope=SCOPE), (None, 0))
+
+	def test_lookup_stays_in_scope(self):
+		value = similarity.simhash(TRACEBACK)
+		self.add("errorease-test-scoped", value)
+
+		self.assertEqual(similarity.lookup(value, 0.9, scope="errorease-test-other"), (None, 0))
+		self.assertEqual(similarity.lookup(value, 0.9, scope=SCOPE), ("errorease-test-scoped", 1.0))
+
+		similarity.remove("errorease-test-scoped", scope=SCOPE)
+		self.assertEqual(similarity.lookup(value, 0.9, scope=SCOPE), (None, 0))
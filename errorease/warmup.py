@@ -0,0 +1,105 @@
+# apps/errorease/errorease/warmup.py
+
+"""
+Optional worker warm-up.
+
+Fresh gunicorn and RQ workers otherwise pay for importing the provider SDK,
+compiling the api.py patterns, loading settings and opening the provider
+connection on their first explanation. With ``"errorease_warmup": 1`` in
+common_site_config.json, the first request or job each worker handles loads
+the settings snapshot and then does the rest in a background thread, so the
+request itself is not delayed.
+"""
+
+import threading
+import time
+
+import frappe
+
+_warmed = False
+_lock = threading.Lock()
+
+SAMPLE_ERROR = """AttributeError: 'Sales Order' object has no attribute 'custom_zone'
+Traceback (most recent call last):
+  File "apps/frappe/frappe/model/document.py", line 941, in save
+    return self._save(*args, **kwargs)
+Value missing for: customer_name (user@example.com, 1234567)
+"""
+
+
+def warm_up(*args, **kwargs):
+    """before_request / before_job hook; runs once per worker process"""
+    global _warmed
+    if _warmed or not frappe.conf.get("errorease_warmup"):
+        return
+
+    with _lock:
+        if _warmed:
+            return
+        _warmed = True
+
+    started = time.perf_counter()
+    logger = frappe.logger("errorease")
+    timings = {}
+
+    # Needs the site's DB connection, so this part runs in the request
+    try:
+        from frappe.utils.password import get_decrypted_password
+
+        from errorease import api
+
+        settings = api._get_settings()
+        provider = (getattr(settings, "provider", None) or "Groq").lower()
+        api_key = None
+        if getattr(settings, "enabled", False):
+            api_key = get_decrypted_password(
+                "ErrorEase Settings", "ErrorEase Settings", "api_key", raise_exception=False
+            )
+        timings["settings"] = _ms(started)
+    except Exception as e:
+        logger.warning(f"ErrorEase warm-up skipped: {e}")
+        return
+
+    threading.Thread(
+        target=_warm_in_background,
+        args=(provider, api_key, logger, timings, started),
+        name="errorease-warmup",
+        daemon=True,
+    ).start()
+
+
+def _warm_in_background(provider, api_key, logger, timings, started):
+    from errorease import api, similarity
+
+    try:
+        # Provider SDK import
+        step = time.perf_counter()
+        if provider == "groq":
+            import groq
+        elif provider in ("openai", "chatgpt"):
+            import openai
+        timings["sdk_import"] = _ms(step)
+
+        # The helpers compile their patterns on first use (re caches them)
+        step = time.perf_counter()
+        redacted = api._redact_message(SAMPLE_ERROR)
+        api._extract_doctype_from_traceback(redacted)
+        api._find_field_in_error(redacted)
+        api._normalize_sections("", redacted, "Sales Order")
+        similarity.simhash(redacted)
+        timings["patterns"] = _ms(step)
+
+        # Build the client and open its connection pool
+        if provider == "groq" and api_key:
+            step = time.perf_counter()
+            api._get_groq_client(api_key).models.list()
+            timings["connection"] = _ms(step)
+
+    except Exception as e:
+        logger.warning(f"ErrorEase warm-up incomplete: {e}")
+
+    logger.info(f"ErrorEase warm-up finished in {_ms(started)} ms: {timings}")
+
+
+def _ms(since):
+    return round((time.perf_counter() - since) * 1000, 1)
@@ -1,23 +1,64 @@
 # apps/errorease/errorease/www/error_overlay.py
 
+import hashlib
+import re
+
 import frappe
 from frappe import _
 
+from errorease import cache
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
 def get_context(context):
+    # frappe's page cache is keyed by the page path, which is the same for
+    # every hash behind the route rule; rendering is two Redis GETs, and
+    # browsers revalidate with the ETag below instead.
     context.no_cache = 1
-    
-    # Get error from query params
-    error_message = frappe.form_dict.get("error")
-    error_hash = frappe.form_dict.get("hash")
-    
-    if error_message:
-        context.error_message = error_message
-    elif error_hash:
-        # Get from cache
-        cache_key = f"errorease:ui:{error_hash}"
-        cached = frappe.cache().get_value(cache_key)
-        if cached:
-            context.error_message = cached.get("error")
-            context.explanation = cached.get("explanation")
-    
-    return context
\ No newline at end of file
+
+    if frappe.session.user == "Guest":
+        raise frappe.PermissionError(_("Log in to view error explanations"))
+
+    error_hash = (frappe.form_dict.get("error_hash") or frappe.form_dict.get("hash") or "").lower()
+    if not HASH_PATTERN.match(error_hash):
+        raise frappe.DoesNotExistError(_("Invalid error reference"))
+
+    entry = cache.get_value(f"errorease:ui:{error_hash}")
+    explanation = entry and cache.get_value(entry.get("key"), shared=entry.get("shared", False))
+    if not explanation:
+        raise frappe.DoesNotExistError(_("This error explanation has expired"))
+
+    context.error_hash = error_hash
+    context.error_message = entry.get("error")
+    context.explanation = explanation.get("explanation")
+
+    try:
+        max_age = int(frappe.db.get_single_value("ErrorEase Settings", "cache_seconds") or 1800)
+    except Exception:
+        max_age = 1800
+
+    etag = hashlib.sha256(
+        (error_hash + (context.error_message or "") + (context.explanation or "")).encode()
+    ).hexdigest()[:32]
+    frappe.local.errorease_overlay_headers = {
+        "ETag": f'"{etag}"',
+        # The HTML carries the viewer's CSRF token: never for shared caches
+        "Cache-Control": f"private, max-age={max_age}",
+    }
+
+    return context
+
+
+def set_cache_headers(response=None, request=None):
+    """after_request hook: attach ETag / Cache-Control and answer revalidations with 304"""
+    headers = getattr(frappe.local, "errorease_overlay_headers", None)
+    if not headers or response is None or response.status_code != 200:
+        return
+
+    for key, value in headers.items():
+        response.headers[key] = value
+
+    if request is not None and headers["ETag"] in request.headers.get("If-None-Match", ""):
+        response.status_code = 304
+        response.set_data(b"")